@@ -3,12 +3,17 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional, List, Dict
 import jwt
 from pydantic import BaseModel, EmailStr
 import os
 from dotenv import load_dotenv
+
+# 아래 모듈(upload_guard, request_timing, classifier_schemas, image_classifier 등)은 import 시점에 환경 변수를
+# 읽으므로 .env 를 먼저 로드해야 .env 에 둔 설정이 적용됨
+load_dotenv()
+
 import pandas as pd
 import uvicorn
 import subprocess
@@ -25,13 +30,31 @@ import requests
 from weather import get_price_data, get_satellite_data
 import threading
 import sys
+import asyncio
 import random
 from youtube import youtube_router
 from chatbot import process_query, ChatMessage, ChatRequest, ChatCandidate, ChatResponse
 from Crawler.crawler_endpoint import router as crawler_router
-from image_classifier import classifier, ImageClassificationResponse
-from PIL import Image
-import io
+from classifier_schemas import (
+    ImageClassificationResponse,
+    BatchClassificationResponse,
+    DiagnosisResponse,
+    BATCH_UPLOAD_MAX_FILES,
+)
+from inference_executor import InferenceOverloaded
+from inference_client import get_classifier
+from inference_ipc import InferenceIPCError
+import model_registry
+import importlib
+import inspect
+import request_timing
+from upload_guard import (
+    UploadLimitMiddleware,
+    UploadRejected,
+    read_image_upload,
+    MULTIPART_OVERHEAD_BYTES,
+    UPLOAD_MAX_BYTES,
+)
 import aiohttp
 from services.comment_service import CommentService
 from services.write_service import WriteService
@@ -58,8 +81,13 @@ app = FastAPI(
 
 app.openapi = lambda: custom_openapi(app)
 
-# Load environment variables
-load_dotenv()
+# 이미지 분류기: 기본은 이 프로세스에서 모델 실행, INFERENCE_MODE=remote 이면 추론 서버(inference_server.py)로 전달
+classifier = get_classifier()
+
+async def classifier_call(method, *args):
+    """로컬/원격 분류기 공통 호출 (원격 분류기의 조회 메서드는 코루틴)"""
+    result = method(*args)
+    return await result if inspect.isawaitable(result) else result
 
 # 도시 매핑 정의
 KOREAN_CITIES = {
@@ -92,6 +120,16 @@ class CommentUpdate(BaseModel):
 # Backend API URL
 BACKEND_URL = "http://localhost:8000"
 
+# 이미지 업로드 엔드포인트의 요청 본문 크기 제한 (한도를 넘으면 본문을 읽기 전에 413)
+def upload_limit_for_path(path: str):
+    if path.startswith("/predict/") and path.endswith("/batch"):
+        return UPLOAD_MAX_BYTES * BATCH_UPLOAD_MAX_FILES + MULTIPART_OVERHEAD_BYTES
+    if path.endswith("_predict") or path.startswith(("/predict/", "/diagnose/")):
+        return UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+    return None
+
+app.add_middleware(UploadLimitMiddleware, limit_for_path=upload_limit_for_path)
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -103,6 +141,16 @@ app.add_middleware(
     max_age=3600,
 )
 
+# 이미지 예측 요청의 단계별 처리 시간 측정 (SERVER_TIMING_ENABLED=1 이면 Server-Timing 헤더 추가)
+@app.middleware("http")
+async def request_timing_middleware(request: Request, call_next):
+    timing = request_timing.begin()
+    response = await call_next(request)
+    request_timing.finish(timing)
+    if request_timing.SERVER_TIMING_ENABLED and timing.crop is not None:
+        response.headers["Server-Timing"] = timing.server_timing_header()
+    return response
+
 # 데이터베이스 설정
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
@@ -200,104 +248,147 @@ async def get_weather(city: str):
             "message": "날씨 데이터를 가져오는데 실패했습니다"
         }
 
-# 이미지 분류 엔드포인트들
-@app.post("/kiwi_predict", response_model=ImageClassificationResponse)
-async def kiwi_predict(file: UploadFile = File(...)):
+async def read_upload(file: UploadFile, crop: str) -> bytes:
+    """
+    업로드 이미지를 크기 한도와 형식을 확인하며 읽고 단계별 시간 측정에 작물과 read 단계를 기록합니다.
+    한도 초과(413)나 지원하지 않는 형식(415)은 디코드 전에 UploadRejected 로 거절됩니다.
+    """
+    request_timing.set_crop(crop)
+    with request_timing.stage("read"):
+        return await read_image_upload(file)
+
+# 이미지 분류 엔드포인트: 레지스트리(model_registry)에 등록된 모든 작물을 하나의 경로로 처리
+@app.post("/predict/{crop}", response_model=ImageClassificationResponse)
+async def predict(crop: str, file: UploadFile = File(...)):
+    """잎 사진 한 장을 crop 모델로 분류합니다."""
+    if crop not in classifier.model_names:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 작물입니다: {crop}")
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_kiwi(image)
-        return result
+        contents = await read_upload(file, crop)
+        return await classifier.classify_upload(crop, contents)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"키위 예측 처리 오류: {str(e)}")
+        logger.error(f"{crop} 예측 처리 오류: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/chamoe_predict", response_model=ImageClassificationResponse)
-async def chamoe_predict(file: UploadFile = File(...)):
-    try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_chamoe(image)
-        return result
-    except Exception as e:
-        logger.error(f"참외 예측 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    
-@app.post("/plant_predict", response_model=ImageClassificationResponse)
-async def plant_predict(file: UploadFile = File(...)):
-    try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_plant(image)
-        return result
-    except Exception as e:
-        logger.error(f"식물 분류 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    
-@app.post("/strawberry_predict", response_model=ImageClassificationResponse)
-async def strawberry_predict(file: UploadFile = File(...)):
+def legacy_predict_endpoint(crop: str):
+    async def endpoint(file: UploadFile = File(...)):
+        return await predict(crop, file)
+    return endpoint
+
+# 기존 클라이언트용 /<작물>_predict 경로 (/predict/{crop} 과 같은 처리)
+for _crop in classifier.model_names:
+    app.add_api_route(
+        f"/{_crop}_predict",
+        legacy_predict_endpoint(_crop),
+        methods=["POST"],
+        response_model=ImageClassificationResponse,
+        name=f"{_crop}_predict",
+    )
+
+@app.get("/models/stats")
+async def get_model_stats():
+    """상주 중인 이미지 분류 모델, 모델별 메모리 비용과 추론 대기열 지표를 반환합니다."""
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_strawberry(image)
-        return result
-    except Exception as e:
-        logger.error(f"딸기 예측 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-   
-@app.post("/potato_predict", response_model=ImageClassificationResponse)
-async def potato_predict(file: UploadFile = File(...)):
+        return await classifier_call(classifier.model_stats)
+    except (InferenceOverloaded, InferenceIPCError) as e:
+        # 원격 추론 모드에서 추론 서버에 연결할 수 없는 경우
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+@app.on_event("startup")
+async def warmup_models():
+    # 미리 로드한 이미지 분류 모델 워밍업은 백그라운드에서 실행 (완료 전까지 /ready 는 503)
+    app.state.warmup_task = asyncio.create_task(classifier.warmup_all())
+    # 가격 예측 모듈은 import 만으로 모델을 로드하지 않으므로 여기서 import 해 두고 (요청 처리 중 import 방지)
+    # PRICE_MODEL_PRELOAD 작물 로드는 기본 스레드 풀에서, 모델 파일 감시는 별도 스레드에서 시작
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_potato(image)
-        return result
-    except Exception as e:
-        logger.error(f"감자 예측 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
+        price = importlib.import_module("pricepython.price")
+    except ImportError as e:
+        logger.error(f"가격 예측 모듈을 불러올 수 없습니다: {str(e)}")
+        return
+    if price.PRICE_MODEL_PRELOAD:
+        app.state.price_preload = asyncio.get_running_loop().run_in_executor(
+            None, price.predict_prices_dict.preload, price.PRICE_MODEL_PRELOAD
+        )
+    price.start_model_watcher()
 
-@app.post("/tomato_predict", response_model=ImageClassificationResponse)
-async def tomato_predict(file: UploadFile = File(...)):
-    try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))    
-        result = await classifier.classify_tomato(image)
-        return result
-    except Exception as e:
-        logger.error(f"토마토 예측 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-   
-@app.post("/apple_predict", response_model=ImageClassificationResponse)
-async def apple_predict(file: UploadFile = File(...)):
+@app.get("/ready")
+async def ready():
+    """
+    로드 밸런서 준비 상태 확인. 미리 로드할 모델(MODEL_PRELOAD)이 모두 로드되고 워밍업을 마치면 200,
+    그 전에는 503 을 반환합니다. 모델별 로드/워밍업 상태를 함께 반환합니다.
+    """
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_apple(image)
-        return result
-    except Exception as e:
-        logger.error(f"사과 예측 처리 오류: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    
-@app.post("/grape_predict", response_model=ImageClassificationResponse)
-async def grape_predict(file: UploadFile = File(...)):
+        readiness = await classifier_call(classifier.readiness)
+    except (InferenceOverloaded, InferenceIPCError) as e:
+        readiness = {"ready": False, "error": f"추론 서버 상태를 확인할 수 없습니다: {str(e)}", "models": {}}
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """
+    이미지 예측 요청의 작물별/단계별 처리 시간 히스토그램을 반환합니다.
+    단계: read, cache, decode, resize, normalize, model, response, total
+    format=json 이면 단계별 횟수, 평균, 최대, p50/p95/p99 (버킷 상한 기준 추정) 를 JSON 으로 반환합니다.
+    """
+    if format == "json":
+        return request_timing.stage_histograms.snapshot()
+    return Response(
+        content=request_timing.stage_histograms.prometheus_text(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+@app.post("/diagnose/{crop}", response_model=DiagnosisResponse)
+async def diagnose(crop: str, file: UploadFile = File(...)):
+    """식물 여부를 먼저 판별하고, 식물이면 같은 이미지로 작물 질병을 분석합니다."""
+    # 레지스트리의 diagnose 항목으로 질병 모델 여부를 판단 (식물 판별 모델 자체는 False)
+    if crop not in classifier.model_names or not model_registry.get_spec(crop)["diagnose"]:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 작물입니다: {crop}")
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_grape(image)
-        return result
+        contents = await read_upload(file, crop)
+        return await classifier.diagnose(crop, contents)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"포도 예측 처리 오류: {str(e)}")
+        logger.error(f"{crop} 진단 처리 오류: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
-    
-@app.post("/corn_predict", response_model=ImageClassificationResponse)
-async def corn_predict(file: UploadFile = File(...)):
+
+@app.post("/predict/{crop}/batch", response_model=BatchClassificationResponse)
+async def batch_predict(crop: str, files: List[UploadFile] = File(...)):
+    """여러 장의 잎 사진을 한 번에 분류합니다. 결과는 업로드 순서와 같습니다."""
+    if crop not in classifier.model_names:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 작물입니다: {crop}")
+    if len(files) > BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"한 번에 최대 {BATCH_UPLOAD_MAX_FILES}장까지 업로드할 수 있습니다"
+        )
     try:
-        contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
-        result = await classifier.classify_corn(image)
-        return result
+        request_timing.set_crop(crop)
+        with request_timing.stage("read"):
+            uploads = await asyncio.gather(
+                *[read_image_upload(file) for file in files],
+                return_exceptions=True,
+            )
+        # 형식/크기로 거절된 파일은 해당 항목에만 오류로 표시하고 나머지는 분류
+        rejected = [str(upload) if isinstance(upload, UploadRejected) else None for upload in uploads]
+        for upload in uploads:
+            if isinstance(upload, Exception) and not isinstance(upload, UploadRejected):
+                raise upload
+        contents = [b"" if error is not None else upload for upload, error in zip(uploads, rejected)]
+        results = await classifier.classify_batch(
+            crop, contents, [file.filename for file in files], rejected=rejected
+        )
+        return BatchClassificationResponse(crop=crop, count=len(results), results=results)
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        logger.error(f"옥수수 예측 처리 오류: {str(e)}")
+        logger.error(f"{crop} 일괄 예측 처리 오류: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/satellite")
@@ -777,6 +868,10 @@ async def get_market():
 async def shutdown_event():
     # PostgreSQL pool 정리
     engine.dispose()
+    # 가격 예측 모델 파일 감시 중지
+    price = sys.modules.get("pricepython.price")
+    if price is not None:
+        price.stop_model_watcher()
 
 # 게시글 수정을 위한 모델
 class PostUpdate(BaseModel):
@@ -1315,13 +1410,20 @@ app.state.conversation_history = []
 app.include_router(crawler_router, prefix="/api/crawler")
 
 @app.get("/predictions/{crop}/{city}")
-async def get_predictions(crop: str, city: str):
+async def get_predictions(crop: str, city: str, days: Optional[int] = None):
+    """
+    작물 가격 예측. days 는 오늘을 포함한 예측 일수 (기본 7일, 최대 30일)이며
+    오늘(current), 내일(tomorrow), 그 이후(weekly) 로 나누어 반환합니다.
+    """
     try:
         from utils.apiUrl import fetchWeatherData
         from pricepython.price import predict_prices
         
         weather_data = await fetchWeatherData(city)
-        predictions = predict_prices(crop, weather_data)
+        # 첫 요청에서는 작물 모델을 로드하므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        predictions = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: predict_prices(crop, weather_data, horizon_days=days)
+        )
         
         if 'error' in predictions:
             raise Exception(predictions['error'])
@@ -1334,6 +1436,85 @@ async def get_predictions(crop: str, city: str):
         print(f"Error in predictions: {str(e)}")
         return {"error": str(e)}
 
+@app.get("/predictions/{city}")
+async def get_all_predictions(city: str, crops: Optional[str] = None, days: Optional[int] = None):
+    """
+    여러 작물의 가격 예측을 한 번에 반환합니다. crops 는 쉼표로 구분한 작물 목록이며 생략하면 전체 작물입니다.
+    날씨는 한 번만 조회하고 작물별 예측은 스레드에서 동시에 실행합니다.
+    예측에 실패한 작물은 errors 에 담기고 나머지 작물의 결과는 그대로 반환됩니다.
+    """
+    try:
+        from utils.apiUrl import fetchWeatherData
+        from pricepython.price import predict_prices, predict_prices_dict
+
+        names = list(dict.fromkeys(
+            name.strip() for name in crops.split(",") if name.strip()
+        )) if crops else list(predict_prices_dict)
+        unknown = [name for name in names if name not in predict_prices_dict]
+        if unknown:
+            raise ValueError(f"지원하지 않는 작물입니다: {', '.join(unknown)}")
+
+        weather_data = await fetchWeatherData(city)
+        # 자정 무렵의 요청도 모든 작물을 같은 날짜 기준으로 예측
+        today = date.today()
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(
+                None, lambda name=name: predict_prices(name, weather_data, horizon_days=days, today=today)
+            )
+            for name in names
+        ])
+
+        predictions, errors = {}, {}
+        for name, result in zip(names, results):
+            if 'error' in result:
+                errors[name] = result['error']
+            else:
+                predictions[name] = result
+        return {
+            "predictions": predictions,
+            "errors": errors,
+            "weather_data": weather_data['raw']
+        }
+    except Exception as e:
+        print(f"Error in predictions: {str(e)}")
+        return {"error": str(e)}
+
+@app.get("/api/predictions/stats")
+async def get_prediction_stats():
+    """작물 가격 예측 결과 캐시 통계 (적중률, 작물별 항목 수)와 로드된 예측 모델"""
+    from pricepython.price import forecast_cache_stats, predict_prices_dict
+
+    return {
+        "forecast_cache": forecast_cache_stats(),
+        "models": {
+            "crops": list(predict_prices_dict),
+            "loaded": predict_prices_dict.loaded(),
+            "versions": predict_prices_dict.versions(),
+        },
+    }
+
+# 가격 예측 모델을 다시 로드할 수 있는 사용자 (쉼표 구분, 비어 있으면 아무도 다시 로드할 수 없음)
+PRICE_MODEL_ADMINS = {user.strip() for user in os.getenv("PRICE_MODEL_ADMINS", "").split(",") if user.strip()}
+
+@app.post("/api/predictions/reload")
+async def reload_prediction_models(crop: Optional[str] = None, current_user: str = Depends(get_current_user)):
+    """
+    pricepython/models/<작물> 의 새 모델 파일을 로드해 smoke 예측으로 검증한 뒤 교체합니다.
+    crop 을 생략하면 로드된 모든 작물을 다시 로드합니다. 검증에 실패하면 기존 모델을 계속 사용합니다.
+    """
+    # 전체 모델 재로드는 CPU 를 많이 쓰고 서비스 중인 모델을 교체하므로 허용 사용자를 지정한 경우에만 허용
+    if current_user not in PRICE_MODEL_ADMINS:
+        raise HTTPException(status_code=403, detail="모델을 다시 로드할 권한이 없습니다")
+    from pricepython.price import predict_prices_dict, reload_price_model
+
+    if crop is not None and crop not in predict_prices_dict:
+        raise HTTPException(status_code=404, detail=f"지원하지 않는 작물입니다: {crop}")
+    crops = [crop] if crop is not None else predict_prices_dict.loaded()
+    loop = asyncio.get_running_loop()
+    results = [await loop.run_in_executor(None, reload_price_model, name) for name in crops]
+    return {"results": results, "versions": predict_prices_dict.versions()}
+
 # --- 퀴즈 관련 Pydantic 모델 추가 ---
 from pydantic import BaseModel
 from typing import List
@@ -0,0 +1,380 @@
+"""
+이미지 분류 모델 벤치마크
+
+모든 분류 모델에 대해 배치 크기와 스레드 수를 바꿔 가며 추론 지연 시간(p50/p95/p99),
+초당 처리 이미지 수, 메모리(RSS)를 측정하고, 디코드부터 응답 생성까지의 전체 classify 경로도
+측정합니다. --backends 를 주면 Keras 모델은 TFLite(XNNPACK) 변환본과 원본 Keras predict 도
+같은 배치 크기/스레드 수로 측정해 onnxruntime 결과와 비교할 수 있습니다.
+결과는 커밋 간에 비교할 수 있도록 JSON 으로 저장하며, --baseline 을 주면
+이전 결과 대비 성능이 기준 이상 나빠진 항목이 있을 때 종료 코드 1 을 반환합니다.
+
+사용 예:
+    python benchmark_classifier.py --output bench.json
+    python benchmark_classifier.py kiwi apple --batch-sizes 1,4,8 --threads 1,2,4
+    python benchmark_classifier.py --images samples/ --baseline bench_prev.json --max-regression 0.1
+    python benchmark_classifier.py apple tomato --backends tflite,keras
+"""
+import os
+
+# 같은 이미지를 반복 분류하므로 결과 캐시를 끄고 측정
+os.environ["RESULT_CACHE_ENABLED"] = "0"
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import onnxruntime
+from PIL import Image
+
+import model_store
+from model_pool import current_rss_bytes
+from tflite_backend import TFLiteModel
+from image_classifier import classifier, create_ort_session, get_model_variant, get_session_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ITERATIONS = 30
+DEFAULT_WARMUP = 3
+SYNTHETIC_IMAGE_SIZE = (1600, 1200)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+# 비교 대상 지표와 "클수록 나쁜지" 여부
+COMPARED_METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "images_per_sec": False,
+    "cached_create_ms": True,
+}
+
+
+def _parse_int_list(value):
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _parse_str_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _percentiles(timings_ms):
+    return {
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 3),
+        "mean_ms": round(float(np.mean(timings_ms)), 3),
+    }
+
+
+def _peak_rss_bytes():
+    # 리눅스에서 ru_maxrss 는 KB 단위
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def synthetic_jpeg(size=SYNTHETIC_IMAGE_SIZE, seed=0):
+    """휴대폰 사진 크기의 합성 JPEG (잎 색에 가까운 부드러운 그라데이션 + 잡음)"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([
+        60 + 40 * np.sin(x / 97.0),
+        120 + 60 * np.cos(y / 131.0),
+        50 + 30 * np.sin((x + y) / 173.0),
+    ], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def load_sources(image_dir=None):
+    sources = {"synthetic": [synthetic_jpeg(seed=seed) for seed in range(4)]}
+    if image_dir:
+        samples = []
+        for filename in sorted(os.listdir(image_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(image_dir, filename), "rb") as f:
+                    samples.append(f.read())
+        if samples:
+            sources["sample"] = samples
+    return sources
+
+
+def create_session(name, threads):
+    """서빙과 같은 세션 설정에서 연산 스레드 수만 바꿔 세션 생성"""
+    path, variant = classifier._onnx_model_path(name)
+    config = {**get_session_config(name), "intra_op_num_threads": threads}
+    session, _ = create_ort_session(name, path, variant, config)
+    return session, variant
+
+
+def bench_startup(name, inputs, iterations, warmup):
+    """원본을 최적화하며 만든 세션과 저장된 최적화 그래프로 만든 세션의 생성 시간과 추론 지연 시간 비교"""
+    path, variant = classifier._onnx_model_path(name)
+    config = get_session_config(name)
+    source_session, source_info = create_ort_session(name, path, variant, config, use_cache=False)
+    # 첫 호출은 저장본이 없으면 만들고, 두 번째 호출로 저장본 로드 시간을 측정
+    create_ort_session(name, path, variant, config, use_cache=True)
+    cached_session, cached_info = create_ort_session(name, path, variant, config, use_cache=True)
+    result = {
+        "model": name,
+        "variant": variant,
+        "stage": "startup",
+        "graph_optimization": config["graph_optimization"],
+        "source_create_ms": source_info["create_ms"],
+        "cached_create_ms": cached_info["create_ms"] if cached_info["graph"] == "cached" else None,
+    }
+    for label, session in (("source", source_session), ("cached", cached_session)):
+        forward = bench_forward(name, session, inputs, 1, iterations, warmup)
+        result[f"{label}_p50_ms"] = forward["p50_ms"] if forward else None
+        result[f"{label}_p95_ms"] = forward["p95_ms"] if forward else None
+    return result
+
+
+def _time_calls(fn, batch_size, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    result = _percentiles(timings)
+    result["images_per_sec"] = round(batch_size * 1000 / result["mean_ms"], 2)
+    return result
+
+
+def _make_batch(inputs, batch_size):
+    return np.stack([inputs[i % len(inputs)] for i in range(batch_size)])
+
+
+def bench_forward(name, session, inputs, batch_size, iterations, warmup):
+    """모델 추론만 측정 (배치 차원이 고정된 모델은 배치 크기 1 만 측정)"""
+    input_meta = session.get_inputs()[0]
+    fixed_batch = input_meta.shape[0]
+    if isinstance(fixed_batch, int) and fixed_batch != batch_size:
+        return None
+    feed = {input_meta.name: _make_batch(inputs, batch_size)}
+    return _time_calls(lambda: session.run(None, feed), batch_size, iterations, warmup)
+
+
+def bench_backends(name, backends, inputs, batch_sizes, thread_counts, iterations, warmup):
+    """
+    Keras 모델의 다른 실행 백엔드 측정. onnxruntime 과 같은 "forward" 항목으로 기록하며 variant 로 구분합니다.
+        tflite: convert_models.py --backend tflite 로 설치한 변환본 (스레드 수별)
+        keras: 원본 Keras model.predict (TensorFlow 가 설치된 경우, 스레드 수는 TensorFlow 기본값)
+    """
+    if not model_store.is_keras_model(name):
+        return []
+    results = []
+    if "tflite" in backends:
+        try:
+            path = model_store.ensure_derived(name, model_store.TFLITE_FILENAME)
+            for threads in thread_counts:
+                model = TFLiteModel(path, num_threads=threads)
+                for batch_size in batch_sizes:
+                    batch = _make_batch(inputs, batch_size)
+                    forward = _time_calls(lambda: model.run(batch), batch_size, iterations, warmup)
+                    results.append({"variant": "tflite", "threads": threads, "batch_size": batch_size, **forward})
+                del model
+        except (model_store.ModelStoreError, ImportError) as e:
+            logger.warning(f"{name} TFLite 측정을 건너뜁니다: {str(e)}")
+    if "keras" in backends:
+        try:
+            import tensorflow as tf
+
+            keras_model = tf.keras.models.load_model(model_store.ensure(name), compile=False)
+            for batch_size in batch_sizes:
+                batch = _make_batch(inputs, batch_size)
+                forward = _time_calls(lambda: keras_model.predict(batch, verbose=0), batch_size, iterations, warmup)
+                results.append({"variant": "keras", "batch_size": batch_size, **forward})
+            del keras_model
+        except ImportError as e:
+            logger.warning(f"{name} Keras 측정을 건너뜁니다: {str(e)}")
+    return results
+
+
+def bench_decode(name, blobs, iterations):
+    """디코드 + 리사이즈 + 정규화 단계만 측정"""
+    preprocessor = classifier.preprocessors[name]
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        preprocessor(blobs[i % len(blobs)])
+        timings.append((time.perf_counter() - started) * 1000)
+    return _percentiles(timings)
+
+
+async def bench_classify_path(name, blobs, iterations, warmup):
+    """엔드포인트와 같은 classify_upload 경로 (실행기, 마이크로 배치 포함) 를 한 장씩 측정"""
+    for i in range(warmup):
+        await classifier.classify_upload(name, blobs[i % len(blobs)])
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await classifier.classify_upload(name, blobs[i % len(blobs)])
+        timings.append((time.perf_counter() - started) * 1000)
+    result = _percentiles(timings)
+    result["images_per_sec"] = round(1000 / result["mean_ms"], 2)
+    return result
+
+
+def run(names, batch_sizes, thread_counts, sources, iterations, warmup, backends=()):
+    results = []
+    for name in names:
+        logger.info(f"{name} 벤치마크 시작")
+        rss_before = current_rss_bytes()
+        synthetic_inputs = [classifier.preprocessors[name](blob) for blob in sources["synthetic"]]
+        results.append(bench_startup(name, synthetic_inputs, iterations, warmup))
+        for source, blobs in sources.items():
+            inputs = [classifier.preprocessors[name](blob) for blob in blobs]
+            decode = bench_decode(name, blobs, iterations)
+            results.append({"model": name, "source": source, "stage": "decode", **decode})
+
+            for threads in thread_counts:
+                session, variant = create_session(name, threads)
+                for batch_size in batch_sizes:
+                    forward = bench_forward(name, session, inputs, batch_size, iterations, warmup)
+                    if forward is None:
+                        continue
+                    results.append({
+                        "model": name,
+                        "variant": variant,
+                        "source": source,
+                        "stage": "forward",
+                        "threads": threads,
+                        "batch_size": batch_size,
+                        **forward,
+                        "rss_bytes": current_rss_bytes(),
+                    })
+                del session
+
+            for forward in bench_backends(name, backends, inputs, batch_sizes, thread_counts, iterations, warmup):
+                results.append({
+                    "model": name,
+                    "source": source,
+                    "stage": "forward",
+                    **forward,
+                    "rss_bytes": current_rss_bytes(),
+                })
+
+            classify = asyncio.run(bench_classify_path(name, blobs, iterations, warmup))
+            results.append({
+                "model": name,
+                "variant": get_model_variant(name),
+                "source": source,
+                "stage": "classify",
+                "batch_size": 1,
+                **classify,
+                "rss_bytes": current_rss_bytes(),
+            })
+        results.append({
+            "model": name,
+            "stage": "memory",
+            "rss_delta_bytes": (current_rss_bytes() or 0) - (rss_before or 0),
+        })
+    return results
+
+
+def _result_key(result):
+    return tuple(result.get(field) for field in ("model", "variant", "source", "stage", "threads", "batch_size"))
+
+
+def compare_with_baseline(results, baseline, max_regression):
+    """기준 결과 대비 max_regression 비율 이상 나빠진 항목 목록"""
+    baseline_by_key = {_result_key(result): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(_result_key(result))
+        if previous is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            if metric not in result or not previous.get(metric):
+                continue
+            change = (result[metric] - previous[metric]) / previous[metric]
+            if (change if higher_is_worse else -change) > max_regression:
+                regressions.append({
+                    "key": dict(zip(("model", "variant", "source", "stage", "threads", "batch_size"),
+                                    _result_key(result))),
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                    "change": round(change, 4),
+                })
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    default_threads = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+
+    parser = argparse.ArgumentParser(description="이미지 분류 모델 벤치마크")
+    parser.add_argument("names", nargs="*", help="모델 이름 (기본값: 전체)")
+    parser.add_argument("--batch-sizes", type=_parse_int_list, default=[1, 2, 4, 8], help="예: 1,2,4,8")
+    parser.add_argument("--threads", type=_parse_int_list, default=default_threads, help="예: 1,2,4")
+    parser.add_argument("--backends", type=_parse_str_list, default=[],
+                        help="Keras 모델에서 함께 측정할 백엔드 (tflite, keras). 예: tflite,keras")
+    parser.add_argument("--images", help="실제 샘플 이미지 디렉토리 (합성 이미지와 함께 측정)")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본값: 표준 출력)")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="허용하는 최대 성능 저하 비율 (기본 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    names = args.names or classifier.model_names
+    results = run(
+        names, args.batch_sizes, args.threads, load_sources(args.images), args.iterations, args.warmup,
+        backends=args.backends,
+    )
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "onnxruntime": onnxruntime.__version__,
+            "platform": platform.platform(),
+            "cpu_count": cores,
+            "iterations": args.iterations,
+            "model_versions": {name: classifier.model_version(name) for name in names},
+            "peak_rss_bytes": _peak_rss_bytes(),
+        },
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(results, json.load(f), args.max_regression)
+        report["regressions"] = regressions
+        if regressions:
+            logger.error(f"성능 저하 {len(regressions)}건 발견 (기준 {args.max_regression:.0%})")
+            exit_code = 1
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+이미지 분류 API 응답 모델
+
+분류 모델을 로드하지 않는 프로세스(원격 추론 모드의 API 서버)에서도 import 할 수 있도록
+onnxruntime 에 의존하지 않는 응답 모델과 업로드 설정만 모아 둡니다.
+"""
+import os
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+# 여러 장 업로드 엔드포인트에서 요청당 최대 이미지 수
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "50"))
+
+# 모델 응답을 위한 Pydantic 모델
+class ImageClassificationResponse(BaseModel):
+    predicted_class: str
+    confidence: float
+    class_probabilities: Dict[str, float]
+    message: Optional[str] = None
+
+# 여러 장 분류 응답 (입력 순서 유지, 이미지별 오류 포함)
+class BatchClassificationItem(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    result: Optional[ImageClassificationResponse] = None
+    error: Optional[str] = None
+
+class BatchClassificationResponse(BaseModel):
+    crop: str
+    count: int
+    results: List[BatchClassificationItem]
+
+# 식물 여부 판별 + 작물 질병 분석 결합 응답
+class DiagnosisResponse(BaseModel):
+    crop: str
+    is_plant: bool
+    plant: ImageClassificationResponse
+    disease: Optional[ImageClassificationResponse] = None
+    message: Optional[str] = None
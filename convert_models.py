@@ -0,0 +1,220 @@
+"""
+Keras(.h5) 질병 분류 모델을 ONNX (또는 TFLite) 로 변환하는 스크립트
+
+변환된 모델은 원본 Keras 모델과 같은 입력에 대해 출력이 일치하는지 검증한 뒤에만
+모델 저장소(model_store)에 설치됩니다. 서빙 프로세스는 변환된 ONNX 파일만 읽으므로
+TensorFlow 는 이 스크립트를 실행하는 빌드 단계에만 필요합니다.
+--backend tflite 로 변환한 TFLite 파일은 MODEL_BACKEND=tflite 로 서빙할 때 사용합니다.
+
+필요 패키지: requirements-convert.txt
+
+사용 예:
+    python convert_models.py                      # 전체 Keras 모델 변환
+    python convert_models.py apple tomato         # 일부 모델만 변환
+    python convert_models.py --images samples/    # 샘플 이미지로도 검증
+    python convert_models.py --verify-only        # 설치된 변환본 재검증
+    python convert_models.py --backend tflite     # TFLite 변환본 생성 (--backend all 은 둘 다)
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import numpy as np
+import onnxruntime
+from PIL import Image
+
+import model_store
+from tflite_backend import TFLiteModel
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 13
+# 원본과 변환본의 출력 허용 오차 (확률값 기준)
+DEFAULT_ATOL = 1e-4
+DEFAULT_RANDOM_SAMPLES = 16
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def keras_model_names():
+    return [name for name in model_store.MODEL_ARTIFACTS if model_store.is_keras_model(name)]
+
+
+def load_keras_model(name):
+    import tensorflow as tf
+
+    return tf.keras.models.load_model(model_store.ensure(name), compile=False)
+
+
+def convert(keras_model, output_path, opset=ONNX_OPSET):
+    """배치 차원을 가변으로 둔 채 Keras 모델을 ONNX 로 변환"""
+    import tensorflow as tf
+    import tf2onnx
+
+    input_shape = tuple(keras_model.inputs[0].shape[1:])
+    input_signature = (tf.TensorSpec((None,) + input_shape, tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(
+        keras_model,
+        input_signature=input_signature,
+        opset=opset,
+        output_path=output_path,
+    )
+    return output_path
+
+
+def convert_tflite(keras_model, output_path):
+    """Keras 모델을 부동소수점 TFLite 모델로 변환 (XNNPACK 으로 실행되도록 양자화하지 않음)"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    return output_path
+
+
+def load_sample_images(image_dir, target_size):
+    """검증용 샘플 이미지를 서빙과 같은 방식(리사이즈, /255)으로 전처리"""
+    arrays = []
+    for filename in sorted(os.listdir(image_dir)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image = Image.open(os.path.join(image_dir, filename)).convert("RGB").resize(target_size)
+        arrays.append(np.asarray(image, dtype=np.float32) / 255.0)
+    return np.stack(arrays) if arrays else None
+
+
+def build_inputs(input_shape, samples=DEFAULT_RANDOM_SAMPLES, image_dir=None, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = rng.random((samples,) + tuple(input_shape), dtype=np.float32)
+    if image_dir:
+        images = load_sample_images(image_dir, (input_shape[1], input_shape[0]))
+        if images is not None:
+            inputs = np.concatenate([inputs, images])
+    return inputs
+
+
+def compare_outputs(expected, actual, atol=DEFAULT_ATOL):
+    """원본/변환본 출력 비교. 최대 오차와 top-1 일치율을 반환"""
+    expected = np.asarray(expected, dtype=np.float32)
+    actual = np.asarray(actual, dtype=np.float32)
+    if expected.shape != actual.shape:
+        return {"passed": False, "error": f"출력 형태 불일치: {expected.shape} != {actual.shape}"}
+
+    if expected.shape[-1] == 1:
+        # 시그모이드 단일 출력 (식물 분류 모델)
+        expected_top1 = (expected[:, 0] > 0.5).astype(int)
+        actual_top1 = (actual[:, 0] > 0.5).astype(int)
+    else:
+        expected_top1 = expected.argmax(axis=-1)
+        actual_top1 = actual.argmax(axis=-1)
+
+    max_abs_diff = float(np.max(np.abs(expected - actual)))
+    top1_agreement = float(np.mean(expected_top1 == actual_top1))
+    return {
+        "passed": max_abs_diff <= atol and top1_agreement == 1.0,
+        "max_abs_diff": max_abs_diff,
+        "top1_agreement": top1_agreement,
+        "samples": int(len(expected)),
+        "atol": atol,
+    }
+
+
+def run_onnx(onnx_path, inputs):
+    session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    return session.run(None, {session.get_inputs()[0].name: inputs})[0]
+
+
+def run_tflite(tflite_path, inputs):
+    return TFLiteModel(tflite_path).run(inputs)
+
+
+BACKEND_CONVERTERS = {
+    "onnx": (model_store.CONVERTED_ONNX_FILENAME, convert, run_onnx, {"converter": "tf2onnx", "opset": ONNX_OPSET}),
+    "tflite": (model_store.TFLITE_FILENAME, convert_tflite, run_tflite, {"converter": "tflite"}),
+}
+
+
+def convert_and_install(name, image_dir=None, atol=DEFAULT_ATOL, force=False, backend="onnx"):
+    filename, convert_fn, run_fn, metadata = BACKEND_CONVERTERS[backend]
+    if not force and model_store.has_derived(name, filename):
+        logger.info(f"{name}: 이미 변환된 {backend} 모델이 있습니다 (--force 로 다시 변환)")
+        return {"passed": True, "skipped": True}
+
+    keras_model = load_keras_model(name)
+    input_shape = tuple(keras_model.inputs[0].shape[1:])
+    inputs = build_inputs(input_shape, image_dir=image_dir)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, filename)
+        convert_fn(keras_model, tmp_path)
+
+        expected = keras_model.predict(inputs, verbose=0)
+        result = compare_outputs(expected, run_fn(tmp_path, inputs), atol=atol)
+        if not result["passed"]:
+            logger.error(f"{name}: 변환 결과가 원본과 다릅니다 {json.dumps(result, ensure_ascii=False)}")
+            return result
+
+        model_store.install_derived(
+            name,
+            tmp_path,
+            filename,
+            metadata={**metadata, "equivalence": result},
+        )
+    logger.info(f"{name}: {backend} 변환 완료 (max_abs_diff={result['max_abs_diff']:.2e})")
+    return result
+
+
+def verify_installed(name, image_dir=None, atol=DEFAULT_ATOL, backend="onnx"):
+    """설치된 변환본을 원본 Keras 모델과 다시 비교"""
+    filename, _, run_fn, _ = BACKEND_CONVERTERS[backend]
+    keras_model = load_keras_model(name)
+    input_shape = tuple(keras_model.inputs[0].shape[1:])
+    inputs = build_inputs(input_shape, image_dir=image_dir, seed=1)
+    path = model_store.ensure_derived(name, filename)
+    return compare_outputs(keras_model.predict(inputs, verbose=0), run_fn(path, inputs), atol=atol)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keras 질병 분류 모델을 ONNX/TFLite 로 변환")
+    parser.add_argument("names", nargs="*", help="모델 이름 (기본값: 전체 Keras 모델)")
+    parser.add_argument("--images", help="검증에 함께 사용할 샘플 이미지 디렉토리")
+    parser.add_argument("--atol", type=float, default=DEFAULT_ATOL, help="허용 오차")
+    parser.add_argument("--force", action="store_true", help="이미 변환되어 있어도 다시 변환")
+    parser.add_argument("--verify-only", action="store_true", help="변환 없이 설치된 변환본만 검증")
+    parser.add_argument(
+        "--backend", choices=["onnx", "tflite", "all"], default="onnx", help="변환할 형식 (기본값: onnx)"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    names = args.names or keras_model_names()
+    backends = list(BACKEND_CONVERTERS) if args.backend == "all" else [args.backend]
+    failed = []
+    for name in names:
+        if not model_store.is_keras_model(name):
+            logger.info(f"{name}: Keras 모델이 아니므로 건너뜁니다")
+            continue
+        for backend in backends:
+            try:
+                if args.verify_only:
+                    result = verify_installed(name, image_dir=args.images, atol=args.atol, backend=backend)
+                    print(f"{name} ({backend}): {json.dumps(result, ensure_ascii=False)}")
+                else:
+                    result = convert_and_install(
+                        name, image_dir=args.images, atol=args.atol, force=args.force, backend=backend
+                    )
+                if not result["passed"]:
+                    failed.append(f"{name} ({backend})")
+            except Exception as e:
+                logger.error(f"{name}: {backend} 변환/검증 실패: {str(e)}")
+                failed.append(f"{name} ({backend})")
+
+    if failed:
+        print(f"실패한 모델: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
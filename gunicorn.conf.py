@@ -0,0 +1,54 @@
+"""
+gunicorn 사전 fork 실행 설정
+
+    gunicorn -c gunicorn.conf.py app:app
+
+preload_app 으로 마스터 프로세스에서 app 을 import 하면서 이미지 분류 모델을 모두 로드한 뒤
+워커를 fork 합니다. 워커는 모델 가중치가 담긴 메모리 페이지를 copy-on-write 로 공유하므로
+uvicorn --workers 처럼 워커마다 모델을 따로 로드할 때보다 워커당 고유 메모리(USS)가 크게 줄어듭니다.
+마스터와 각 워커의 메모리(rss/pss/uss)는 시작 로그와 /models/stats 의 process 항목에서 확인합니다.
+"""
+import gc
+import os
+
+# app import 전에 설정해야 image_classifier 가 사전 fork 모드로 동작 (전체 모델 미리 로드, 단일 스레드 세션)
+os.environ["PREFORK_MODE"] = "1"
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+
+def _format_memory(memory):
+    if not memory:
+        return "측정 불가"
+    return ", ".join(f"{key.replace('_bytes', '')}={value / 1024 / 1024:.1f}MB" for key, value in memory.items())
+
+
+def when_ready(server):
+    import sys
+
+    from model_pool import process_memory
+
+    # 원격 추론 모드(INFERENCE_MODE=remote)에서는 API 프로세스가 image_classifier 를 import 하지 않음
+    image_classifier = sys.modules.get("image_classifier")
+    if image_classifier is not None:
+        models = image_classifier.classifier.models
+        resident = [name for name in image_classifier.classifier.model_names if name in models]
+        missing = [name for name in image_classifier.MODEL_PRELOAD if name not in resident]
+        server.log.info(f"마스터에 로드된 모델 ({len(resident)}개): {', '.join(resident) or '없음'}")
+        if missing:
+            # 마스터에서 로드하지 못한 모델은 워커마다 따로 로드되어 공유되지 않음
+            server.log.warning(f"마스터에서 로드하지 못해 워커가 공유하지 않는 모델: {', '.join(missing)}")
+    server.log.info(f"마스터 메모리 (모델 로드 후): {_format_memory(process_memory())}")
+    # 지금까지 만든 객체를 GC 추적 대상에서 빼서, 워커의 GC 가 공유 페이지를 건드려 복사되지 않도록 함
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    from model_pool import process_memory
+
+    worker.log.info(f"워커 {worker.pid} 메모리 (fork 직후): {_format_memory(process_memory())}")
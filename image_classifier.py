@@ -1,507 +1,739 @@
-import torch
 import onnxruntime
 import numpy as np
-from torchvision import transforms
-import io
 from PIL import Image
-import requests
-import tensorflow as tf
 import logging
-from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import List, Optional
+import asyncio
+import functools
+import glob
+import hashlib
+import io
 import os
+import time
+import model_registry
+import model_store
+from model_pool import ModelPool, process_memory
+from inference_batcher import MicroBatcher
+from tflite_backend import TFLiteModel
+from inference_executor import default_executor
+from image_preprocessing import ImagePreprocessor, softmax, top_k
+from result_cache import content_hash, default_result_cache
+import request_timing
+from classifier_schemas import (
+    ImageClassificationResponse,
+    BatchClassificationItem,
+    DiagnosisResponse,
+)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 모델 응답을 위한 Pydantic 모델
-class ImageClassificationResponse(BaseModel):
-    predicted_class: str
-    confidence: float
-    class_probabilities: Dict[str, float]
-    message: Optional[str] = None
+# gunicorn.conf.py 로 실행하는 사전 fork 모드: 마스터 프로세스에서 모델을 한 번 로드하고
+# 워커 프로세스는 fork 로 물려받은 모델을 copy-on-write 로 공유 (기본으로 전체 모델을 미리 로드)
+PREFORK_MODE = os.getenv("PREFORK_MODE", "0") == "1"
+
+# 상주 모델 메모리 예산 (MB, 0 이면 무제한)
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# 시작 시 미리 로드할 모델 목록 (쉼표 구분, "all" 이면 전체, 지정하지 않으면 레지스트리의 preload 모델)
+MODEL_PRELOAD = [
+    name.strip() for name in os.getenv("MODEL_PRELOAD", "all" if PREFORK_MODE else "").split(",") if name.strip()
+]
+if MODEL_PRELOAD == ["all"]:
+    MODEL_PRELOAD = model_registry.model_names()
+elif not MODEL_PRELOAD:
+    MODEL_PRELOAD = model_registry.preload_names()
+# 모델을 로드할 때마다(시작 시 로드, 메모리 예산으로 해제된 뒤 다시 로드 포함) 더미 입력으로 실행해
+# 요청이 커널 초기화, 메모리 할당 지연을 겪지 않도록 함
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "2"))
+# 시작 시 로드/워밍업에 실패한 MODEL_PRELOAD 모델의 재시도 횟수와 첫 재시도 간격 (초, 재시도마다 두 배, 최대 60초)
+# 재시도까지 모두 실패한 모델은 /ready 에 failed 로 보고하고 준비 상태를 막지 않음
+MODEL_WARMUP_RETRIES = int(os.getenv("MODEL_WARMUP_RETRIES", "5"))
+MODEL_WARMUP_RETRY_SECONDS = float(os.getenv("MODEL_WARMUP_RETRY_SECONDS", "2"))
+
+# 마이크로 배치 기본 설정 (최대 배치 크기, 최대 대기 시간 ms)
+# 모델별 설정은 레지스트리의 batch 항목 또는 BATCH_MAX_SIZE_<모델>, BATCH_MAX_WAIT_MS_<모델> 환경 변수
+DEFAULT_BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+DEFAULT_BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# 여러 장 업로드에서 한 번의 추론에 넣을 최대 이미지 수 (요청당 최대 이미지 수는 classifier_schemas)
+BATCH_UPLOAD_CHUNK_SIZE = int(os.getenv("BATCH_UPLOAD_CHUNK_SIZE", "16"))
+
+# 서빙할 모델 변형: "fp32" (기본) 또는 "int8" (quantize_models.py 로 만든 양자화 모델)
+# MODEL_VARIANT 로 전체, 레지스트리의 variant 또는 MODEL_VARIANT_<모델> 로 모델별 지정
+DEFAULT_MODEL_VARIANT = os.getenv("MODEL_VARIANT", "fp32")
+
+
+def get_model_variant(name):
+    return (
+        os.getenv(f"MODEL_VARIANT_{name.upper()}")
+        or model_registry.get_spec(name)["variant"]
+        or DEFAULT_MODEL_VARIANT
+    )
+
+# 추론 백엔드: "onnx" (기본, onnxruntime) 또는 "tflite" (Keras 모델만, convert_models.py --backend tflite 로 변환)
+# MODEL_BACKEND 로 전체, 레지스트리의 backend 또는 MODEL_BACKEND_<모델> 로 모델별 지정
+DEFAULT_MODEL_BACKEND = os.getenv("MODEL_BACKEND", "onnx")
+
+
+def get_model_backend(name):
+    return (
+        os.getenv(f"MODEL_BACKEND_{name.upper()}")
+        or model_registry.get_spec(name)["backend"]
+        or DEFAULT_MODEL_BACKEND
+    )
+
+
+def get_batch_config(name):
+    config = {
+        "max_batch_size": DEFAULT_BATCH_MAX_SIZE,
+        "max_wait_ms": DEFAULT_BATCH_MAX_WAIT_MS,
+        **model_registry.get_spec(name)["batch"],
+    }
+    if os.getenv(f"BATCH_MAX_SIZE_{name.upper()}"):
+        config["max_batch_size"] = int(os.getenv(f"BATCH_MAX_SIZE_{name.upper()}"))
+    if os.getenv(f"BATCH_MAX_WAIT_MS_{name.upper()}"):
+        config["max_wait_ms"] = float(os.getenv(f"BATCH_MAX_WAIT_MS_{name.upper()}"))
+    return config
+
+# 모델별 onnxruntime 세션 설정
+# 기본값은 ORT_* 환경 변수이며 레지스트리의 session 항목 또는 ORT_<설정>_<모델> 환경 변수로 모델별 덮어쓰기 가능
+#   graph_optimization: 그래프 최적화 수준 (disable, basic, extended, all)
+#   intra_op_num_threads: 연산 하나를 나누어 실행할 스레드 수
+#   inter_op_num_threads: 서로 독립적인 연산을 동시에 실행할 스레드 수
+#   enable_cpu_mem_arena: 메모리 아레나 사용 여부 (끄면 유휴 메모리가 줄지만 할당이 느려짐)
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+# 웹 워커 프로세스 수 x 추론 스레드 수가 코어 수를 넘지 않도록 연산 스레드 수를 나눔
+DEFAULT_INTRA_OP_THREADS = max(
+    1,
+    (os.cpu_count() or 1) // (int(os.getenv("WEB_CONCURRENCY", "1")) * int(os.getenv("INFERENCE_WORKERS", "2"))),
+)
+DEFAULT_SESSION_CONFIG = {
+    "graph_optimization": os.getenv("ORT_GRAPH_OPTIMIZATION", "all"),
+    "intra_op_num_threads": int(os.getenv("ORT_INTRA_OP_THREADS", str(DEFAULT_INTRA_OP_THREADS))),
+    "inter_op_num_threads": int(os.getenv("ORT_INTER_OP_THREADS", "1")),
+    "enable_cpu_mem_arena": os.getenv("ORT_CPU_MEM_ARENA", "1") == "1",
+}
+SESSION_ENV_OVERRIDES = {
+    "graph_optimization": ("ORT_GRAPH_OPTIMIZATION", str),
+    "intra_op_num_threads": ("ORT_INTRA_OP_THREADS", int),
+    "inter_op_num_threads": ("ORT_INTER_OP_THREADS", int),
+    "enable_cpu_mem_arena": ("ORT_CPU_MEM_ARENA", lambda value: value == "1"),
+}
+# 최적화를 마친 그래프를 모델 캐시에 저장해 두고 다음 시작부터 최적화 없이 바로 로드
+ORT_OPTIMIZED_GRAPH_CACHE = os.getenv("ORT_OPTIMIZED_GRAPH_CACHE", "1") == "1"
+
+
+def get_session_config(name):
+    config = {**DEFAULT_SESSION_CONFIG, **model_registry.get_spec(name)["session"]}
+    for key, (env_name, cast) in SESSION_ENV_OVERRIDES.items():
+        value = os.getenv(f"{env_name}_{name.upper()}")
+        if value:
+            config[key] = cast(value)
+    if config["graph_optimization"] not in GRAPH_OPTIMIZATION_LEVELS:
+        logger.warning(f"{name} 모델의 알 수 없는 그래프 최적화 수준({config['graph_optimization']})을 무시합니다")
+        config["graph_optimization"] = "all"
+    if PREFORK_MODE and (config["intra_op_num_threads"] != 1 or config["inter_op_num_threads"] != 1):
+        # onnxruntime 스레드 풀은 fork 후 자식 프로세스로 이어지지 않으므로 호출 스레드에서만 실행
+        logger.warning(f"사전 fork 모드에서는 {name} 모델의 onnxruntime 스레드 수를 1 로 고정합니다")
+        config["intra_op_num_threads"] = 1
+        config["inter_op_num_threads"] = 1
+    return config
+
+
+def build_session_options(config):
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[config["graph_optimization"]]
+    options.intra_op_num_threads = config["intra_op_num_threads"]
+    options.inter_op_num_threads = config["inter_op_num_threads"]
+    options.enable_cpu_mem_arena = config["enable_cpu_mem_arena"]
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    return options
+
+
+def optimized_graph_path(name, source_path, variant, config):
+    """원본 파일, onnxruntime 버전, 최적화 수준이 바뀌면 달라지는 최적화 그래프 경로"""
+    stat = os.stat(source_path)
+    key = hashlib.sha256(
+        f"{stat.st_size}:{stat.st_mtime_ns}:{onnxruntime.__version__}:{config['graph_optimization']}".encode()
+    ).hexdigest()[:12]
+    return model_store.derived_path(name, f"optimized-{variant}-{key}.onnx")
+
+
+def create_ort_session(name, source_path, variant, config, use_cache=ORT_OPTIMIZED_GRAPH_CACHE):
+    """
+    설정대로 세션을 만들고 (세션, 세션 정보)를 반환합니다.
+    저장된 최적화 그래프가 있으면 최적화를 생략하고 로드하며, 없으면 원본을 최적화하면서 결과를 저장합니다.
+    """
+    started = time.perf_counter()
+    providers = ["CPUExecutionProvider"]
+    cached_path = None
+    if use_cache and config["graph_optimization"] != "disable":
+        cached_path = optimized_graph_path(name, source_path, variant, config)
+
+    session, graph = None, "source"
+    if cached_path and os.path.exists(cached_path):
+        options = build_session_options(config)
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            session = onnxruntime.InferenceSession(cached_path, options, providers=providers)
+            graph = "cached"
+        except Exception as e:
+            logger.warning(f"{name} 저장된 최적화 그래프를 읽을 수 없어 원본에서 다시 최적화합니다: {str(e)}")
+
+    if session is None:
+        options = build_session_options(config)
+        tmp_path = None
+        if cached_path and os.access(os.path.dirname(cached_path), os.W_OK):
+            tmp_path = f"{cached_path}.tmp-{os.getpid()}"
+            options.optimized_model_filepath = tmp_path
+        session = onnxruntime.InferenceSession(source_path, options, providers=providers)
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.replace(tmp_path, cached_path)
+                graph = "optimized"
+                # 이전 원본/버전으로 만든 최적화 그래프 정리
+                for stale in glob.glob(model_store.derived_path(name, f"optimized-{variant}-*.onnx")):
+                    if stale != cached_path:
+                        os.remove(stale)
+            except OSError as e:
+                logger.warning(f"{name} 최적화 그래프 저장 실패: {str(e)}")
+
+    info = {
+        **config,
+        "graph": graph,
+        "create_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    return session, info
 
 class ImageClassifier:
     def __init__(self):
-        self.kiwi_session = self._load_kiwi_model()
-        self.chamoe_session = self._load_chamoe_model()
-        self.plant_session = self._load_plant_model()
-        self.strawberry_session = self._load_strawberry_model()
-        self.apple_session = self._load_apple_model()
-        self.potato_session = self._load_potato_model()
-        self.tomato_session = self._load_tomato_model()
-        self.grape_session = self._load_grape_model()
-        self.corn_session = self._load_corn_model()
-        
-        # 클래스 레이블 정의
-        self.kiwi_labels = {
-            0: "잎_점무늬병",
-            1: "잎_정상",
-            2: "잎_총채벌레"
-        }
-        
-        self.chamoe_labels = {
-            0: "노균병",
-            1: "정상",
-            2: "흰가루병"
-        }
-        
-        self.plant_labels = {
-            0: "비식물",
-            1: "식물"
-        }
-
-        self.strawberry_labels = {
-            0: "딸기 잎끝마름",
-            1: "정상"
-        }
-
-        self.apple_labels = {
-            0: "사과 검은무늬병",
-            1: "사과 흑색 부패병",
-            2: "사과 삼나무 녹병",
-            3: "정상"
+        # 로드할 때마다 갱신되는 모델별 상태. 로더(_load_session)가 기록하므로 풀보다 먼저 준비
+        self._model_versions = {}
+        self._session_info = {}
+        self._warmup = {}  # 이름 -> 마지막 로드의 성공 여부와 워밍업 결과 (모델이 해제되어도 유지, 다시 로드하면 교체)
+        self._warmup_done = False
+        self._warmup_failed = set()  # 재시도까지 모두 실패한 MODEL_PRELOAD 모델
+
+        # 모델은 처음 사용될 때 로드되며 메모리 예산을 넘으면 오래된 모델부터 해제됩니다
+        self.models = ModelPool(
+            {name: functools.partial(self._load_model, name) for name in model_registry.model_names()},
+            budget_bytes=MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+            size_hint=self._artifact_size,
+        )
+        self.preprocessors = {
+            name: ImagePreprocessor(**model_registry.preprocess_config(name))
+            for name in model_registry.model_names()
         }
 
-        self.potato_labels = {
-            0: "감자 잎마름병",
-            1: "감자 역병",
-            2: "정상"
-        }
+        # 같은 이미지를 다시 올린 경우 추론 없이 돌려줄 결과 캐시 (RESULT_CACHE_ENABLED=0 이면 None)
+        self.result_cache = default_result_cache()
 
-        self.tomato_labels = {
-            0: "토마토 박테리아성 반점병",
-            1: "토마토 잎마름병",
-            2: "토마토 역병",
-            3: "토마토 잎곰팡이병",
-            4: "토마토 세프토이라 잎반점병",
-            5: "토마토 거미 진드기 피해",
-            6: "토마토 표적반점병",
-            7: "토마토 황화 잎말림 바이러스",
-            8: "토마토 모자이크 바이러스",
-            9: "정상"
-        }
-
-        self.grape_labels = {
-            0: "포도 에스카병",
-            1: "포도 흑색 부패병",
-            2: "포도 잎마름병",
-            3: "정상"
-        }
+        # 모델 로드, 전처리, 추론은 이벤트 루프를 막지 않도록 전용 스레드 풀에서 실행
+        self.executor = default_executor()
 
-        self.corn_labels = {
-            0: "옥수수 세르코스포라 잎반점병",
-            1: "옥수수 일반 녹병",
-            2: "옥수수 북부 잎마름병",
-            3: "정상"
+        # 동시 요청을 모아 한 번에 추론하는 모델별 마이크로 배처
+        self.batchers = {
+            name: MicroBatcher(
+                name,
+                functools.partial(self.executor.run, self._run_batch, name),
+                **get_batch_config(name),
+            )
+            for name in model_registry.model_names()
         }
-              
-
-    def _load_kiwi_model(self):
-        try:
-            url = "https://huggingface.co/jjiw/densenet161-onnx/resolve/main/model.onnx"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            return onnxruntime.InferenceSession(model_bytes.getvalue())
-        except Exception as e:
-            logger.error(f"키위 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_chamoe_model(self):
-        try:
-            url = "https://huggingface.co/jjiw/disease-classifier-onnx/resolve/main/model.onnx"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            return onnxruntime.InferenceSession(model_bytes.getvalue())
-        except Exception as e:
-            logger.error(f"참외 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_plant_model(self):
-        try:
-            url = "https://huggingface.co/jjiw/plant-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "temp_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"식물 분류 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_strawberry_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/strawberry-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "strawberry_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"딸기 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_apple_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/apple-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "apple_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"사과 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_potato_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/potato-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "potato_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"감자 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_tomato_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/tomato-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "tomato_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"토마토 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_grape_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/grape-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "grape_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"포도 모델 로드 실패: {str(e)}")
-            return None
-
-    def _load_corn_model(self):
-        try:
-            url = "https://huggingface.co/ro981009/corn-classifier-h5/resolve/main/model.h5"
-            response = requests.get(url)
-            model_bytes = io.BytesIO(response.content)
-            temp_model_path = "corn_model.h5"
-            with open(temp_model_path, "wb") as f:
-                f.write(model_bytes.getvalue())
-            model = tf.keras.models.load_model(temp_model_path)
-            os.remove(temp_model_path)
-            return model
-        except Exception as e:
-            logger.error(f"옥수수 모델 로드 실패: {str(e)}")
-            return None
-
 
-    def preprocess_image(self, image, target_size=(224, 224)):
-        """공통 이미지 전처리 함수"""
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-        image = image.resize(target_size)
-        return image
-
-    async def classify_kiwi(self, image: Image.Image) -> ImageClassificationResponse:
+        # 배처와 실행기까지 모두 준비된 뒤 마지막에 미리 로드
+        self.preload()
+
+    def preload(self):
+        """MODEL_PRELOAD 모델을 로드하고 로드에 성공한 모델 이름 목록을 반환"""
+        loaded = [name for name in MODEL_PRELOAD if self.models.get(name) is not None]
+        failed = [name for name in MODEL_PRELOAD if name not in loaded]
+        if MODEL_PRELOAD:
+            logger.info(f"미리 로드한 모델 (pid {os.getpid()}): {', '.join(loaded) or '없음'}")
+        if failed:
+            logger.error(f"미리 로드하지 못한 모델: {', '.join(failed)}")
+        return loaded
+
+    @staticmethod
+    def _artifact_size(name):
+        path = model_store.artifact_path(name)
+        if model_store.is_keras_model(name):
+            path = model_store.derived_path(name, model_store.CONVERTED_ONNX_FILENAME)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    @property
+    def model_names(self):
+        return list(self.batchers.keys())
+
+    def model_version(self, name):
+        """마지막으로 로드한 세션의 버전 (폴백한 변형/백엔드 포함, 로드한 적이 없으면 None)"""
+        return self._model_versions.get(name)
+
+    async def _loaded_version(self, name):
+        """
+        결과 캐시 키에 쓰는 모델 버전. 설정값이 아니라 실제로 로드된 세션의 버전이어야
+        int8 -> fp32, tflite -> onnx 로 폴백한 결과가 다른 변형의 키로 저장되지 않습니다.
+        마지막으로 로드한 버전은 모델이 해제되어도 남아 있으므로 캐시 조회는 모델을 다시 로드하지 않으며,
+        한 번도 로드한 적이 없을 때만 추론 스레드에서 로드해 버전을 확인합니다.
+        다시 로드한 모델의 버전이 달라졌다면 _cache_put 이 이전 버전 키로 저장하지 않습니다.
+        """
+        version = self._model_versions.get(name)
+        if version is not None:
+            return version
+        if await self.executor.run(self.models.get, name) is None:
+            raise ValueError(f"{model_registry.get_spec(name)['display_name']} 모델이 로드되지 않았습니다")
+        return self._model_versions[name]
+
+    def _cache_put(self, name, version, key, result):
+        """추론하는 동안 모델이 다른 버전으로 다시 로드되었으면 어느 버전의 결과인지 알 수 없으므로 저장하지 않음"""
+        if key is None or self._model_versions.get(name) != version:
+            return
+        self.result_cache.put(key, dict(result))
+
+    def model_stats(self):
+        """상주 모델과 모델별 메모리 비용, 로드 시간, 배치 처리, 추론 대기열 통계"""
+        stats = self.models.stats()
+        for name, batcher in self.batchers.items():
+            stats["models"][name]["version"] = self.model_version(name)
+            stats["models"][name]["batching"] = batcher.stats()
+            stats["models"][name]["session"] = self._session_info.get(name)
+        stats["executor"] = self.executor.stats()
+        stats["process"] = {"pid": os.getpid(), "prefork": PREFORK_MODE, **(process_memory() or {})}
+        stats["result_cache"] = self.result_cache.stats() if self.result_cache is not None else None
+        return stats
+
+    def _warm_session(self, name, session):
+        """
+        더미 입력으로 막 로드한 세션을 실행해 onnxruntime 커널 초기화와 메모리 할당을 미리 끝냅니다.
+        마이크로 배치가 만드는 가장 큰 배치 크기까지 실행해 두어 배치가 커질 때의 할당도 미리 수행합니다.
+        """
+        started = time.perf_counter()
         try:
-            if self.kiwi_session is None:
-                raise ValueError("키위 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            transform = transforms.Compose([
-                transforms.ToTensor(),
-                transforms.Normalize(mean=[0.485, 0.456, 0.406], 
-                                  std=[0.229, 0.224, 0.225])
-            ])
-            img_tensor = transform(image).numpy()
-
-            input_name = self.kiwi_session.get_inputs()[0].name
-            outputs = self.kiwi_session.run(None, 
-                {input_name: img_tensor.reshape(1, 3, 224, 224)})
-            probabilities = torch.nn.functional.softmax(torch.tensor(outputs[0][0]), dim=0)
-            
-            predicted_idx = probabilities.argmax().item()
-            confidence = float(probabilities[predicted_idx])
-
-            class_probs = {
-                self.kiwi_labels[i]: float(probabilities[i])
-                for i in range(len(self.kiwi_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.kiwi_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="키위 질병 분석이 완료되었습니다"
-            )
-
+            rng = np.random.default_rng(0)
+            input_shape = self.preprocessors[name].input_shape
+            for batch_size in sorted({1, get_batch_config(name)["max_batch_size"]}):
+                dummy = rng.random((batch_size,) + input_shape, dtype=np.float32)
+                for _ in range(MODEL_WARMUP_RUNS):
+                    self._run_batch(name, dummy, session)
+            result = {"warm": True, "error": None}
         except Exception as e:
-            logger.error(f"키위 분류 오류: {str(e)}")
-            raise
-
-    async def classify_chamoe(self, image: Image.Image) -> ImageClassificationResponse:
-        try:
-            if self.chamoe_session is None:
-                raise ValueError("참외 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            input_name = self.chamoe_session.get_inputs()[0].name
-            outputs = self.chamoe_session.run(None, {input_name: img_array})
-            probabilities = torch.nn.functional.softmax(torch.tensor(outputs[0][0]), dim=0)
-            
-            predicted_idx = probabilities.argmax().item()
-            confidence = float(probabilities[predicted_idx])
-
-            class_probs = {
-                self.chamoe_labels[i]: float(probabilities[i])
-                for i in range(len(self.chamoe_labels))
+            logger.error(f"{name} 모델 워밍업 실패: {str(e)}")
+            result = {"warm": False, "error": str(e)}
+        result["warmup_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"{name} 모델 워밍업 {'완료' if result['warm'] else '실패'} ({result['warmup_ms']}ms)")
+        return result
+
+    def _load_succeeded(self, name):
+        """마지막 로드가 성공하고 워밍업까지 마쳤는지 (MODEL_WARMUP=0 이면 로드 성공 여부)"""
+        state = self._warmup.get(name) or {}
+        return bool(state.get("warm") or (not MODEL_WARMUP and state.get("loaded")))
+
+    async def warmup_all(self):
+        """
+        MODEL_PRELOAD 모델 중 로드/워밍업에 실패한 모델을 추론 스레드에서 다시 로드합니다 (로드하면서 워밍업).
+        실패한 모델은 간격을 두 배씩 늘리며 MODEL_WARMUP_RETRIES 번까지 재시도하고, 그래도 실패하면 failed 로 보고합니다.
+        """
+        pending = [name for name in MODEL_PRELOAD if not self._load_succeeded(name)]
+        delay = MODEL_WARMUP_RETRY_SECONDS
+        for attempt in range(MODEL_WARMUP_RETRIES + 1):
+            if attempt:
+                logger.warning(f"{delay}초 후 모델 로드/워밍업 재시도 ({attempt}/{MODEL_WARMUP_RETRIES}): {', '.join(pending)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+            for name in pending:
+                # 로드는 되었지만 워밍업에 실패한 모델은 해제한 뒤 다시 로드
+                self.models.evict(name)
+                try:
+                    await self.executor.run(self.models.get, name)
+                except Exception as e:
+                    logger.error(f"{name} 모델을 시작 시 로드하지 못했습니다: {str(e)}")
+            pending = [name for name in pending if not self._load_succeeded(name)]
+            if not pending:
+                break
+        if pending:
+            logger.error(f"재시도 후에도 로드/워밍업에 실패한 모델 (준비 상태에서 제외): {', '.join(pending)}")
+        self._warmup_failed = set(pending)
+        self._warmup_done = True
+
+    def readiness(self):
+        """
+        모델별 준비 상태. MODEL_PRELOAD 모델(required)이 모두 로드되고 워밍업을 마쳐야 ready.
+        메모리 예산으로 해제된 모델도 마지막 로드가 워밍업까지 성공했다면 준비된 것으로 보며,
+        다시 로드될 때 워밍업도 다시 수행됩니다. 재시도까지 실패한 모델은 failed 로 표시하고 준비 여부에서 제외합니다.
+        그 외 모델은 첫 요청에서 로드되므로 상태만 보여주고 준비 여부에 포함하지 않습니다.
+        """
+        models = {}
+        for name in self.model_names:
+            state = self._warmup.get(name) or {}
+            ready = self._load_succeeded(name)
+            models[name] = {
+                "required": name in MODEL_PRELOAD,
+                "loaded": name in self.models,
+                "warm": state.get("warm", False),
+                "warmup_ms": state.get("warmup_ms"),
+                "error": state.get("error"),
+                "ready": ready,
+                "failed": not ready and name in self._warmup_failed,
             }
+        return {
+            "ready": self._warmup_done and all(
+                model["ready"] or model["failed"] for model in models.values() if model["required"]
+            ),
+            "warmup_done": self._warmup_done,
+            "failed": [name for name, model in models.items() if model["failed"]],
+            "models": models,
+        }
 
-            return ImageClassificationResponse(
-                predicted_class=self.chamoe_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="참외 질병 분석이 완료되었습니다"
-            )
-
-        except Exception as e:
-            logger.error(f"참외 분류 오류: {str(e)}")
-            raise
-
-    async def classify_plant(self, image: Image.Image) -> ImageClassificationResponse:
-        try:
-            if self.plant_session is None:
-                raise ValueError("식물 분류 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            predictions = self.plant_session.predict(img_array)
-            confidence = float(predictions[0][0])
+    def _run_batch(self, name, batch, session=None):
+        """(N, ...) 입력 배치를 한 번에 추론해 클래스별 확률 (N, 클래스 수)을 반환"""
+        outputs = self._forward(name, batch, session)
+        if model_registry.needs_softmax(name):
+            outputs = softmax(outputs, axis=-1)
+        return outputs
+
+    def _forward(self, name, batch, session=None):
+        if session is None:
+            session = self.models.get(name)
+        if session is None:
+            raise ValueError(f"{name} 모델이 로드되지 않았습니다")
+
+        if isinstance(session, TFLiteModel):
+            return session.run(batch)
+
+        if isinstance(session, onnxruntime.InferenceSession):
+            input_meta = session.get_inputs()[0]
+            fixed_batch = input_meta.shape[0]
+            if isinstance(fixed_batch, int) and fixed_batch != len(batch):
+                # 배치 차원이 고정된 채로 export 된 모델은 한 장씩 실행
+                return np.concatenate([
+                    session.run(None, {input_meta.name: batch[i:i + fixed_batch]})[0]
+                    for i in range(0, len(batch), fixed_batch)
+                ])
+            return session.run(None, {input_meta.name: batch})[0]
+
+        # ONNX 변환본이 없을 때의 Keras 폴백
+        return session.predict(batch, verbose=0)
+
+    def _build_response(self, name, prediction) -> ImageClassificationResponse:
+        with request_timing.stage("response"):
+            return self._format_response(name, prediction)
+
+    def _format_response(self, name, prediction) -> ImageClassificationResponse:
+        """모델 출력 한 행(클래스별 확률)을 응답으로 변환"""
+        spec = model_registry.get_spec(name)
+        labels = spec["labels"]
+
+        if spec["output"] == "sigmoid":
+            confidence = float(prediction[0])
             predicted_idx = 1 if confidence > 0.5 else 0
-
-            class_probs = {
-                "비식물": float(confidence),
-                "식물": float(1 - confidence)
-            }
-
             return ImageClassificationResponse(
-                predicted_class=self.plant_labels[predicted_idx],
+                predicted_class=labels[predicted_idx],
                 confidence=confidence if predicted_idx == 1 else 1 - confidence,
-                class_probabilities=class_probs,
-                message="식물 분류가 완료되었습니다"
+                class_probabilities={
+                    labels[0]: confidence,
+                    labels[1]: 1 - confidence
+                },
+                message=spec["message"]
             )
 
-        except Exception as e:
-            logger.error(f"식물 분류 오류: {str(e)}")
-            raise
+        indices, values = top_k(prediction, 1)
+        predicted_idx, confidence = int(indices[0]), float(values[0])
+        return ImageClassificationResponse(
+            predicted_class=labels[predicted_idx],
+            confidence=confidence,
+            class_probabilities={
+                labels[i]: float(prediction[i])
+                for i in range(len(labels))
+            },
+            message=spec["message"]
+        )
+
+    def _onnx_model_path(self, name):
+        """설정된 변형(fp32/int8)의 ONNX 경로와 실제 사용한 변형을 반환"""
+        variant = get_model_variant(name)
+        if variant == "int8":
+            try:
+                return model_store.ensure_derived(name, model_store.QUANTIZED_ONNX_FILENAME), "int8"
+            except model_store.ModelStoreError as e:
+                logger.warning(f"{name} INT8 모델을 사용할 수 없어 FP32 로 실행합니다: {str(e)}")
+        elif variant != "fp32":
+            logger.warning(f"{name} 모델의 알 수 없는 변형 설정({variant})을 무시하고 FP32 로 실행합니다")
+        return model_store.onnx_path(name), "fp32"
+
+    def _load_tflite(self, name):
+        """TFLite 변환본을 로드. 스레드 수는 onnxruntime 세션 설정과 같은 값을 사용"""
+        started = time.perf_counter()
+        config = get_session_config(name)
+        model = TFLiteModel(
+            model_store.ensure_derived(name, model_store.TFLITE_FILENAME),
+            num_threads=config["intra_op_num_threads"],
+        )
+        self._model_versions[name] = f"{model_store.model_version(name)}:tflite"
+        self._session_info[name] = {
+            "backend": "tflite",
+            "num_threads": model.num_threads,
+            "create_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        logger.info(f"{name} TFLite 모델 로드 {self._session_info[name]['create_ms']}ms")
+        return model
+
+    def _load_session(self, name):
+        """
+        모델을 설정된 백엔드로 로드합니다. 기본은 onnxruntime (Keras 모델은 convert_models.py 로 변환한 파일)이며,
+        MODEL_BACKEND=tflite 인 Keras 모델은 TFLite 변환본을 사용하고 없으면 onnxruntime 으로 실행합니다.
+        """
+        backend = get_model_backend(name)
+        fallback_from = None
+        if backend == "tflite":
+            if model_store.is_keras_model(name):
+                try:
+                    return self._load_tflite(name)
+                except (model_store.ModelStoreError, ImportError, ValueError, RuntimeError) as e:
+                    # 손상되었거나 호환되지 않는 .tflite 파일은 인터프리터가 RuntimeError 를 냄
+                    logger.warning(f"{name} TFLite 모델을 사용할 수 없어 onnxruntime 으로 실행합니다: {str(e)}")
+                    fallback_from = "tflite"
+            else:
+                logger.warning(f"{name} 모델은 ONNX 로 배포된 모델이라 TFLite 백엔드를 지원하지 않습니다")
+        elif backend != "onnx":
+            logger.warning(f"{name} 모델의 알 수 없는 백엔드 설정({backend})을 무시하고 onnxruntime 으로 실행합니다")
 
-    async def classify_strawberry(self, image: Image.Image) -> ImageClassificationResponse:
         try:
-            if self.strawberry_session is None:
-                raise ValueError("딸기 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            predictions = self.strawberry_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.strawberry_labels[i]: float(predictions[0][i])
-                for i in range(len(self.strawberry_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.strawberry_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="딸기 질병 분석이 완료되었습니다"
+            path, variant = self._onnx_model_path(name)
+            session, info = create_ort_session(name, path, variant, get_session_config(name))
+            logger.info(
+                f"{name} onnxruntime 세션 생성 {info['create_ms']}ms "
+                f"(변형: {variant}, 그래프: {info['graph']}{', tflite 대신 사용' if fallback_from else ''})"
             )
+            self._model_versions[name] = f"{model_store.model_version(name)}:{variant}"
+            self._session_info[name] = {"backend": "onnx", "fallback_from": fallback_from, **info}
+            return session
+        except model_store.ModelStoreError:
+            if not model_store.is_keras_model(name):
+                raise
+            # 변환본이 없는 개발 환경에서는 TensorFlow 가 설치되어 있을 때만 원본 Keras 모델 사용
+            try:
+                import tensorflow as tf
+            except ImportError:
+                raise model_store.ModelStoreError(
+                    f"{name} 모델의 ONNX 변환본이 없습니다. python convert_models.py {name} 로 변환하세요"
+                )
+            logger.warning(f"{name} 모델의 ONNX 변환본이 없어 Keras 모델로 실행합니다")
+            model = tf.keras.models.load_model(model_store.ensure(name), compile=False)
+            self._model_versions[name] = f"{model_store.model_version(name)}:keras"
+            return model
 
-        except Exception as e:
-            logger.error(f"딸기 분류 오류: {str(e)}")
-            raise
-
-    async def classify_apple(self, image: Image.Image) -> ImageClassificationResponse:
+    def _load_model(self, name):
+        """ModelPool 로더. 로드에 성공하면 요청에 쓰이기 전에 워밍업까지 마친 세션을 반환"""
         try:
-            if self.apple_session is None:
-                raise ValueError("사과 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            predictions = self.apple_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.apple_labels[i]: float(predictions[0][i])
-                for i in range(len(self.apple_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.apple_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="사과 질병 분석이 완료되었습니다"
-            )
-
+            session = self._load_session(name)
         except Exception as e:
-            logger.error(f"사과 분류 오류: {str(e)}")
-            raise
-
-    async def classify_potato(self, image: Image.Image) -> ImageClassificationResponse:
-        try:
-            if self.potato_session is None:
-                raise ValueError("감자 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            predictions = self.potato_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.potato_labels[i]: float(predictions[0][i])
-                for i in range(len(self.potato_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.potato_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="감자 질병 분석이 완료되었습니다"
-            )
-
-        except Exception as e:
-            logger.error(f"감자 분류 오류: {str(e)}")
-            raise
+            logger.error(f"{model_registry.get_spec(name)['display_name']} 모델 로드 실패: {str(e)}")
+            self._warmup[name] = {"loaded": False, "warm": False, "warmup_ms": None, "error": str(e)}
+            return None
+        result = self._warm_session(name, session) if MODEL_WARMUP else {"warm": False, "error": None, "warmup_ms": None}
+        self._warmup[name] = {"loaded": True, **result}
+        return session
 
-    async def classify_tomato(self, image: Image.Image) -> ImageClassificationResponse:
+    async def classify(self, name: str, image: Image.Image) -> ImageClassificationResponse:
+        """이미지 한 장을 레지스트리에 등록된 name 모델로 분류 (동시 요청은 마이크로 배치로 묶어 추론)"""
+        display_name = model_registry.get_spec(name)["display_name"]
         try:
-            if self.tomato_session is None:
-                raise ValueError("토마토 모델이 로드되지 않았습니다")
+            session = await self.executor.run(self.models.get, name)
+            if session is None:
+                raise ValueError(f"{display_name} 모델이 로드되지 않았습니다")
 
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
+            img_array = await self.executor.run(self.preprocessors[name], image)
 
-            predictions = self.tomato_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.tomato_labels[i]: float(predictions[0][i])
-                for i in range(len(self.tomato_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.tomato_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="토마토 질병 분석이 완료되었습니다"
-            )
+            with request_timing.stage("model"):
+                prediction = await self.batchers[name].submit(img_array)
+            return self._build_response(name, prediction)
 
         except Exception as e:
-            logger.error(f"토마토 분류 오류: {str(e)}")
+            logger.error(f"{display_name} 분류 오류: {str(e)}")
             raise
 
-    async def classify_grape(self, image: Image.Image) -> ImageClassificationResponse:
-        try:
-            if self.grape_session is None:
-                raise ValueError("포도 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            predictions = self.grape_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.grape_labels[i]: float(predictions[0][i])
-                for i in range(len(self.grape_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.grape_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="포도 질병 분석이 완료되었습니다"
+    async def _cache_keys(self, name, blobs):
+        """
+        업로드 바이트 해시와 로드된 모델 버전으로 결과 캐시 키 생성 (해시는 기본 스레드 풀에서 계산).
+        (키 목록, 모델 버전)을 반환
+        """
+        if self.result_cache is None:
+            return [None] * len(blobs), None
+        loop = asyncio.get_running_loop()
+        digests = await loop.run_in_executor(None, lambda: [content_hash(blob) for blob in blobs])
+        version = await self._loaded_version(name)
+        return [self.result_cache.make_key(digest, name, version) for digest in digests], version
+
+    async def diagnose(self, name: str, contents: bytes) -> DiagnosisResponse:
+        """
+        식물 분류 모델을 먼저 실행해 식물 사진이 아니면 바로 반환하고, 식물이면 같은 디코드 결과로
+        작물 질병 모델을 실행합니다. 업로드와 디코드/리사이즈는 한 번만 수행됩니다.
+        """
+        if name not in self.batchers or not model_registry.get_spec(name)["diagnose"]:
+            raise ValueError(f"지원하지 않는 작물입니다: {name}")
+        request_timing.set_crop(name)
+        plant = model_registry.PLANT_MODEL
+
+        digest, plant_key, plant_version = None, None, None
+        plant_result, disease_result = None, None
+        if self.result_cache is not None:
+            loop = asyncio.get_running_loop()
+            digest = await loop.run_in_executor(None, content_hash, contents)
+            plant_version = await self._loaded_version(plant)
+            plant_key = self.result_cache.make_key(digest, plant, plant_version)
+            cached = await self.result_cache.aget(plant_key)
+            plant_result = ImageClassificationResponse(**cached) if cached is not None else None
+
+        image, plant_input = None, None
+        if plant_result is None:
+            image, plant_input = await self.executor.run(self._decode_and_prepare, plant, contents)
+            with request_timing.stage("model"):
+                plant_prediction = await self.batchers[plant].submit(plant_input)
+            plant_result = self._build_response(plant, plant_prediction)
+            self._cache_put(plant, plant_version, plant_key, plant_result)
+
+        is_plant = plant_result.predicted_class == model_registry.get_spec(plant)["labels"][1]
+        if not is_plant:
+            return DiagnosisResponse(
+                crop=name,
+                is_plant=False,
+                plant=plant_result,
+                message="식물 사진이 아닙니다. 작물의 잎이 잘 보이도록 다시 촬영해주세요"
             )
 
-        except Exception as e:
-            logger.error(f"포도 분류 오류: {str(e)}")
-            raise
-
-    async def classify_corn(self, image: Image.Image) -> ImageClassificationResponse:
-        try:
-            if self.corn_session is None:
-                raise ValueError("옥수수 모델이 로드되지 않았습니다")
-
-            image = self.preprocess_image(image)
-            img_array = np.array(image).astype('float32') / 255.0
-            img_array = np.expand_dims(img_array, axis=0)   
-
-            predictions = self.corn_session.predict(img_array)
-            predicted_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_idx])
-
-            class_probs = {
-                self.corn_labels[i]: float(predictions[0][i])
-                for i in range(len(self.corn_labels))
-            }
-
-            return ImageClassificationResponse(
-                predicted_class=self.corn_labels[predicted_idx],
-                confidence=confidence,
-                class_probabilities=class_probs,
-                message="옥수수 질병 분석이 완료되었습니다"
+        # 질병 모델은 식물 사진으로 판별된 뒤에만 로드해 버전을 확인
+        disease_key, disease_version = None, None
+        if digest is not None:
+            disease_version = await self._loaded_version(name)
+            disease_key = self.result_cache.make_key(digest, name, disease_version)
+            cached = await self.result_cache.aget(disease_key)
+            disease_result = ImageClassificationResponse(**cached) if cached is not None else None
+
+        if disease_result is None:
+            preprocessor = self.preprocessors[name]
+            if plant_input is not None and model_registry.preprocess_config(name) == model_registry.preprocess_config(plant):
+                # 입력 형식이 식물 분류 모델과 같으면 배열까지 재사용
+                disease_input = plant_input
+            else:
+                if image is None or image.size != preprocessor.size:
+                    image, disease_input = await self.executor.run(self._decode_and_prepare, name, contents)
+                else:
+                    disease_input = await self.executor.run(preprocessor.to_array, image)
+            with request_timing.stage("model"):
+                disease_prediction = await self.batchers[name].submit(disease_input)
+            disease_result = self._build_response(name, disease_prediction)
+            self._cache_put(name, disease_version, disease_key, disease_result)
+
+        return DiagnosisResponse(
+            crop=name,
+            is_plant=True,
+            plant=plant_result,
+            disease=disease_result,
+            message=disease_result.message
+        )
+
+    async def classify_upload(self, name: str, contents: bytes) -> ImageClassificationResponse:
+        """업로드된 이미지 바이트를 분류합니다. 같은 이미지와 모델 버전의 결과는 캐시에서 반환"""
+        if name not in self.batchers:
+            raise ValueError(f"지원하지 않는 작물입니다: {name}")
+        request_timing.set_crop(name)
+
+        with request_timing.stage("cache"):
+            (cache_key,), version = await self._cache_keys(name, [contents])
+            cached = await self.result_cache.aget(cache_key) if cache_key is not None else None
+        if cached is not None:
+            return ImageClassificationResponse(**cached)
+
+        image = Image.open(io.BytesIO(contents))
+        result = await self.classify(name, image)
+        self._cache_put(name, version, cache_key, result)
+        return result
+
+    async def classify_batch(self, name: str, images: List[bytes],
+                             filenames: Optional[List[str]] = None,
+                             rejected: Optional[List[Optional[str]]] = None) -> List[BatchClassificationItem]:
+        """
+        여러 장의 이미지를 추론 스레드에서 동시에 디코드한 뒤 배치 단위로 한 번에 추론합니다.
+        결과는 입력 순서와 같고, 읽을 수 없는 이미지는 해당 항목에 error 로 표시됩니다.
+        결과 캐시에 있는 이미지는 디코드와 추론을 건너뜁니다.
+        rejected 에 오류 메시지가 있는 이미지 (업로드 단계에서 거절된 파일) 는 분류하지 않습니다.
+        """
+        if name not in self.batchers:
+            raise ValueError(f"지원하지 않는 작물입니다: {name}")
+        filenames = filenames or [None] * len(images)
+        errors = list(rejected) if rejected else [None] * len(images)
+        request_timing.set_crop(name)
+
+        results = [None] * len(images)
+        with request_timing.stage("cache"):
+            cache_keys, version = await self._cache_keys(name, images)
+            for i, cache_key in enumerate(cache_keys):
+                cached = await self.result_cache.aget(cache_key) if cache_key is not None else None
+                if cached is not None:
+                    results[i] = ImageClassificationResponse(**cached)
+        pending = [i for i, result in enumerate(results) if result is None and errors[i] is None]
+
+        if pending:
+            session = await self.executor.run(self.models.get, name)
+            if session is None:
+                raise ValueError(f"{name} 모델이 로드되지 않았습니다")
+
+            # 추론 스레드 수만큼 나누어 디코드/전처리 (이미지마다 작업을 만들면 대기열이 넘칠 수 있음)
+            group_size = -(-len(pending) // self.executor.max_workers)
+            groups = [pending[start:start + group_size] for start in range(0, len(pending), group_size)]
+            decoded = await asyncio.gather(*[
+                self.executor.run(self._decode_group, name, [images[i] for i in group])
+                for group in groups
+            ])
+            arrays = {}
+            for group, group_results in zip(groups, decoded):
+                for i, (array, error) in zip(group, group_results):
+                    if array is not None:
+                        arrays[i] = array
+                    errors[i] = error
+
+            valid = [i for i in pending if i in arrays]
+            chunks = [valid[start:start + BATCH_UPLOAD_CHUNK_SIZE]
+                      for start in range(0, len(valid), BATCH_UPLOAD_CHUNK_SIZE)]
+            with request_timing.stage("model"):
+                outputs = await asyncio.gather(*[
+                    self.executor.run(self._run_batch, name, np.stack([arrays[i] for i in chunk]))
+                    for chunk in chunks
+                ])
+            for chunk, chunk_outputs in zip(chunks, outputs):
+                for i, prediction in zip(chunk, chunk_outputs):
+                    results[i] = self._build_response(name, prediction)
+                    self._cache_put(name, version, cache_keys[i], results[i])
+
+        return [
+            BatchClassificationItem(
+                index=i,
+                filename=filenames[i],
+                result=results[i],
+                error=errors[i],
             )
-
-        except Exception as e:
-            logger.error(f"옥수수 분류 오류: {str(e)}")
-            raise
+            for i in range(len(images))
+        ]
+
+    def _decode_and_prepare(self, name, contents):
+        image = self.preprocessors[name].decode(contents)
+        return image, self.preprocessors[name].to_array(image)
+
+    def _decode_group(self, name, blobs):
+        results = []
+        for blob in blobs:
+            try:
+                results.append((self.preprocessors[name](blob), None))
+            except Exception as e:
+                results.append((None, f"이미지를 읽을 수 없습니다: {str(e)}"))
+        return results
 
 # 싱글톤 인스턴스 생성
 classifier = ImageClassifier() 
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+분류 모델 공통 이미지 전처리와 후처리 (NumPy 전용)
+
+torchvision 의 ToTensor + Normalize 와 torch softmax 를 대체합니다.
+채널별 스케일/오프셋 상수는 생성 시 한 번만 계산해 두고, 이미지마다 출력 배열 하나만
+할당한 뒤 제자리 연산으로 정규화와 레이아웃 변환(NHWC/NCHW)을 한 번에 처리합니다.
+
+JPEG 는 DCT 스케일링(draft 모드)으로 목표 크기에 가까운 해상도로 바로 디코드하므로
+수천만 화소 휴대폰 사진도 전체 해상도로 풀지 않습니다.
+"""
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from request_timing import stage
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def decode_image(source, size=(224, 224)) -> Image.Image:
+    """
+    이미지 바이트(또는 아직 로드되지 않은 PIL 이미지)를 size 크기의 RGB 이미지로 디코드합니다.
+    JPEG 는 목표 크기 이상인 가장 작은 1/2, 1/4, 1/8 스케일로 디코드하고,
+    EXIF 회전 보정과 RGB 변환을 같은 단계에서 처리합니다.
+    """
+    with stage("decode"):
+        image = Image.open(io.BytesIO(source)) if isinstance(source, (bytes, bytearray, memoryview)) else source
+
+        # 디코드 전에 읽어야 하는 메타데이터
+        orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+
+        if image.format == "JPEG":
+            # 회전 후에도 가로/세로 모두 목표 크기 이상이 되도록 긴 변 기준으로 요청
+            side = max(size)
+            image.draft("RGB", (side, side))
+
+        if orientation in (2, 3, 4, 5, 6, 7, 8):
+            image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        # 디코드 시간과 리사이즈 시간을 나누어 측정하도록 여기서 픽셀을 읽어 둠
+        image.load()
+
+    with stage("resize"):
+        if image.size != tuple(size):
+            image = image.resize(size)
+    return image
+
+
+class ImagePreprocessor:
+    def __init__(self, size=(224, 224), layout="NHWC", mean=None, std=None):
+        """
+        size: (너비, 높이)
+        layout: 모델 입력 레이아웃. "NHWC" (Keras 계열) 또는 "NCHW" (PyTorch 계열)
+        mean, std: 0~1 스케일 기준 채널별 정규화 값. 없으면 /255 만 적용
+        """
+        if layout not in ("NHWC", "NCHW"):
+            raise ValueError(f"지원하지 않는 레이아웃입니다: {layout}")
+        self.size = tuple(size)
+        self.layout = layout
+
+        # (x / 255 - mean) / std  ==  x * scale + offset
+        mean = np.asarray(mean if mean is not None else (0.0, 0.0, 0.0), dtype=np.float32)
+        std = np.asarray(std if std is not None else (1.0, 1.0, 1.0), dtype=np.float32)
+        scale = (1.0 / (255.0 * std)).astype(np.float32)
+        offset = (-mean / std).astype(np.float32)
+        self._normalize = bool(np.any(mean != 0) or np.any(std != 1))
+        if layout == "NCHW":
+            self._scale = scale.reshape(3, 1, 1)
+            self._offset = offset.reshape(3, 1, 1)
+        else:
+            self._scale = scale
+            self._offset = offset
+
+    @property
+    def input_shape(self):
+        width, height = self.size
+        return (3, height, width) if self.layout == "NCHW" else (height, width, 3)
+
+    def decode(self, image) -> Image.Image:
+        return decode_image(image, self.size)
+
+    def to_array(self, pixels) -> np.ndarray:
+        """(높이, 너비, 3) uint8 픽셀을 모델 입력 배열 (배치 차원 제외)로 변환"""
+        with stage("normalize"):
+            pixels = np.asarray(pixels)
+            if self.layout == "NCHW":
+                pixels = pixels.transpose(2, 0, 1)
+            out = np.empty(self.input_shape, dtype=np.float32)
+            np.multiply(pixels, self._scale, out=out, dtype=np.float32)
+            if self._normalize:
+                np.add(out, self._offset, out=out)
+        return out
+
+    def __call__(self, image) -> np.ndarray:
+        """이미지 바이트 또는 PIL 이미지를 모델 입력 배열로 변환"""
+        return self.to_array(self.decode(image))
+
+
+def softmax(logits, axis=-1):
+    """수치적으로 안정적인 softmax. 배치 전체에 대해 한 번에 계산"""
+    logits = np.asarray(logits, dtype=np.float32)
+    shifted = logits - logits.max(axis=axis, keepdims=True)
+    np.exp(shifted, out=shifted)
+    shifted /= shifted.sum(axis=axis, keepdims=True)
+    return shifted
+
+
+def top_k(probabilities, k=1):
+    """확률이 높은 순서대로 상위 k 개의 (인덱스, 확률) 반환"""
+    probabilities = np.asarray(probabilities)
+    k = min(k, probabilities.shape[-1])
+    indices = np.argpartition(-probabilities, k - 1, axis=-1)[..., :k]
+    values = np.take_along_axis(probabilities, indices, axis=-1)
+    order = np.argsort(-values, axis=-1)
+    return np.take_along_axis(indices, order, axis=-1), np.take_along_axis(values, order, axis=-1)
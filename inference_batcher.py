@@ -0,0 +1,106 @@
+"""
+모델별 동적 마이크로 배치 스케줄러
+
+동시에 들어온 단일 이미지 요청을 최대 max_wait_ms 동안 또는 max_batch_size 개가
+모일 때까지 모아 한 번의 배치 추론으로 처리하고, 결과를 각 요청에 나누어 돌려줍니다.
+"""
+import asyncio
+import inspect
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, name, run_batch, max_batch_size=8, max_wait_ms=5.0):
+        """
+        name: 모델 이름 (로그/통계용)
+        run_batch: (N, ...) 배열을 받아 첫 번째 축이 N 인 출력 배열을 반환하는 함수 또는 코루틴 함수
+        """
+        self.name = name
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self._pending = []  # (입력, future, 제출 시각)
+        self._timer = None
+        self._tasks = set()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_seen": 0,
+            "errors": 0,
+            "wait_seconds_total": 0.0,
+        }
+
+    async def submit(self, item):
+        """단일 입력을 배치 큐에 넣고 해당 입력의 출력 행을 기다립니다."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait_ms == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def stats(self):
+        batches = self._stats["batches"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._tasks),
+            "avg_batch_size": round(self._stats["items"] / batches, 2) if batches else None,
+            "avg_batch_wait_ms": (
+                round(self._stats["wait_seconds_total"] / self._stats["items"] * 1000, 3)
+                if self._stats["items"] else None
+            ),
+            **self._stats,
+        }
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            # 대기 중 취소된 요청(클라이언트 연결 종료 등)은 제외
+            batch = [entry for entry in batch if not entry[1].done()]
+            if batch:
+                task = asyncio.ensure_future(self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        dispatched = time.perf_counter()
+        self._stats["wait_seconds_total"] += sum(dispatched - submitted for _, _, submitted in batch)
+        inputs = np.stack([item for item, _, _ in batch])
+        try:
+            outputs = self._run_batch(inputs)
+            if inspect.isawaitable(outputs):
+                outputs = await outputs
+            if len(outputs) != len(batch):
+                raise RuntimeError(
+                    f"{self.name} 배치 출력 크기 불일치: 입력 {len(batch)}개, 출력 {len(outputs)}개"
+                )
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.error(f"{self.name} 배치 추론 오류 (batch={len(batch)}): {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._stats["batches"] += 1
+        self._stats["items"] += len(batch)
+        self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+        for (_, future, _), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
@@ -0,0 +1,106 @@
+"""
+원격 추론 서버 클라이언트
+
+INFERENCE_MODE=remote 이면 API 서버는 ImageClassifier 대신 RemoteClassifier 를 사용합니다.
+같은 메서드(classify_upload, classify_batch, diagnose, model_stats, readiness)를 제공하며,
+업로드 이미지 바이트를 유닉스 소켓으로 추론 서버(inference_server.py)에 보내고 결과를 받습니다.
+추론 서버에서 측정한 단계별 시간은 API 서버의 /metrics 에 함께 기록됩니다.
+"""
+import asyncio
+import itertools
+import logging
+import os
+
+import model_registry
+import request_timing
+from classifier_schemas import BatchClassificationItem, DiagnosisResponse, ImageClassificationResponse
+from inference_executor import InferenceOverloaded
+from inference_ipc import InferenceIPCError, read_message, socket_path, write_message
+
+logger = logging.getLogger(__name__)
+
+# 추론 서버 연결/응답 제한 시간 (초)
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "1"))
+INFERENCE_REQUEST_TIMEOUT = float(os.getenv("INFERENCE_REQUEST_TIMEOUT", "30"))
+
+
+class RemoteClassifier:
+    def __init__(self, path=None, connect_timeout=INFERENCE_CONNECT_TIMEOUT, request_timeout=INFERENCE_REQUEST_TIMEOUT):
+        self.path = path or socket_path()
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._ids = itertools.count(1)
+
+    @property
+    def model_names(self):
+        return model_registry.model_names()
+
+    async def _call(self, op, args=None, blobs=()):
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(self.path), timeout=self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.error(f"추론 서버 연결 실패 ({self.path}): {str(e)}")
+            # 추론 계층이 없거나 재시작 중인 경우도 잠시 후 재시도하도록 503 으로 응답
+            raise InferenceOverloaded("추론 서버에 연결할 수 없습니다. 잠시 후 다시 시도해주세요")
+
+        try:
+            await write_message(writer, {"id": next(self._ids), "op": op, "args": args or {}}, blobs)
+            header, _ = await asyncio.wait_for(read_message(reader), timeout=self.request_timeout)
+            if header is None:
+                raise InferenceIPCError("추론 서버가 응답 없이 연결을 닫았습니다")
+        except (InferenceIPCError, ConnectionError, asyncio.TimeoutError) as e:
+            # 전송 실패는 추론 계층 과부하/재시작과 같이 503 으로 처리
+            logger.error(f"추론 서버 통신 실패 ({op}): {str(e) or type(e).__name__}")
+            raise InferenceOverloaded("추론 서버 응답이 없습니다. 잠시 후 다시 시도해주세요")
+        finally:
+            writer.close()
+
+        request_timing.merge(header.get("timings") or {})
+        if not header.get("ok"):
+            if header.get("error_type") == "overloaded":
+                raise InferenceOverloaded(header.get("error"))
+            if header.get("error_type") == "value":
+                raise ValueError(header.get("error"))
+            raise RuntimeError(header.get("error"))
+        return header["result"]
+
+    async def classify_upload(self, name: str, contents: bytes) -> ImageClassificationResponse:
+        result = await self._call("classify", {"crop": name}, [contents])
+        return ImageClassificationResponse(**result)
+
+    async def diagnose(self, name: str, contents: bytes) -> DiagnosisResponse:
+        result = await self._call("diagnose", {"crop": name}, [contents])
+        return DiagnosisResponse(**result)
+
+    async def classify_batch(self, name, images, filenames=None, rejected=None):
+        results = await self._call(
+            "classify_batch",
+            {"crop": name, "filenames": filenames, "rejected": rejected},
+            images,
+        )
+        return [BatchClassificationItem(**item) for item in results]
+
+    async def model_stats(self):
+        return {"mode": "remote", "socket": self.path, **(await self._call("model_stats"))}
+
+    async def readiness(self):
+        try:
+            return await self._call("readiness")
+        except Exception as e:
+            return {"ready": False, "error": f"추론 서버 상태를 확인할 수 없습니다: {str(e)}", "models": {}}
+
+    async def warmup_all(self):
+        # 워밍업은 추론 서버가 시작할 때 수행
+        return None
+
+
+def get_classifier():
+    """INFERENCE_MODE 에 따라 로컬 ImageClassifier 또는 원격 추론 서버 클라이언트를 반환"""
+    if os.getenv("INFERENCE_MODE", "local") == "remote":
+        logger.info(f"원격 추론 모드: {socket_path()}")
+        return RemoteClassifier()
+    from image_classifier import classifier
+
+    return classifier
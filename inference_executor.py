@@ -0,0 +1,119 @@
+"""
+이미지 분류 추론 전용 스레드 풀
+
+TensorFlow predict 나 onnxruntime run 처럼 오래 걸리는 동기 작업을 이벤트 루프 밖의
+전용 스레드에서 실행해 다른 요청(/cities 등)이 막히지 않도록 합니다.
+대기열이 가득 차면 작업을 받지 않고 InferenceOverloaded 를 발생시킵니다 (API 에서는 503).
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(Exception):
+    """추론 대기열이 가득 찬 경우"""
+
+
+class InferenceExecutor:
+    def __init__(self, max_workers=2, max_queue=32):
+        """
+        max_workers: 동시에 실행할 추론 작업 수
+        max_queue: 실행을 기다릴 수 있는 최대 작업 수 (초과 시 거절)
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+        )
+        self._lock = threading.Lock()
+        self._submitted = 0  # 대기 중 + 실행 중
+        self._running = 0
+        self._stats = {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_queue_depth_seen": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "run_seconds_total": 0.0,
+        }
+
+    async def run(self, fn, *args):
+        """fn(*args) 를 추론 스레드에서 실행하고 결과를 기다립니다."""
+        with self._lock:
+            if self._submitted >= self.max_workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise InferenceOverloaded("추론 요청이 너무 많습니다. 잠시 후 다시 시도해주세요")
+            self._submitted += 1
+            queue_depth = self._submitted - self._running
+            self._stats["max_queue_depth_seen"] = max(self._stats["max_queue_depth_seen"], queue_depth)
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._running += 1
+                self._stats["wait_seconds_total"] += wait
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait)
+            try:
+                result = fn(*args)
+            except Exception:
+                with self._lock:
+                    self._stats["failed"] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats["run_seconds_total"] += time.perf_counter() - started_at
+            with self._lock:
+                self._stats["completed"] += 1
+            return result
+
+        def release(_):
+            # 실행 완료/실패/취소 어느 경우든 대기열 자리를 반환
+            with self._lock:
+                self._submitted -= 1
+
+        # 요청 단위 측정(request_timing) 등 호출한 쪽의 컨텍스트를 스레드에서도 유지
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, job)
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            finished = self._stats["completed"] + self._stats["failed"]
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": self._submitted - self._running,
+                "avg_wait_ms": (
+                    round(self._stats["wait_seconds_total"] / finished * 1000, 3) if finished else None
+                ),
+                "max_wait_ms": round(self._stats["wait_seconds_max"] * 1000, 3),
+                "avg_run_ms": (
+                    round(self._stats["run_seconds_total"] / finished * 1000, 3) if finished else None
+                ),
+                **{key: value for key, value in self._stats.items()
+                   if key not in ("wait_seconds_total", "wait_seconds_max", "run_seconds_total")},
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def default_executor():
+    return InferenceExecutor(
+        max_workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+        max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "32")),
+    )
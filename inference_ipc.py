@@ -0,0 +1,62 @@
+"""
+API 서버와 추론 서버 사이의 유닉스 소켓 메시지 형식
+
+메시지 하나는 [헤더 길이 4바이트][JSON 헤더][바이너리 blob ...] 로 구성됩니다.
+헤더의 "blobs" 에 각 blob 의 길이가 순서대로 들어가며, 업로드 이미지처럼 큰 바이트는
+JSON 으로 인코딩하지 않고 blob 으로 그대로 전달합니다.
+"""
+import asyncio
+import json
+import os
+import struct
+
+DEFAULT_INFERENCE_SOCKET = "/tmp/smartfarm-inference.sock"
+# 헤더 최대 크기 (잘못된 메시지로 큰 메모리를 할당하지 않도록 제한)
+MAX_HEADER_BYTES = 16 * 1024 * 1024
+
+_HEADER_LENGTH = struct.Struct("!I")
+
+
+class InferenceIPCError(Exception):
+    """추론 서버와의 통신 실패"""
+
+
+def socket_path():
+    # .env 를 읽은 뒤에 호출되도록 import 시점이 아니라 사용 시점에 확인
+    return os.getenv("INFERENCE_SOCKET", DEFAULT_INFERENCE_SOCKET)
+
+
+async def write_message(writer, header, blobs=()):
+    header = {**header, "blobs": [len(blob) for blob in blobs]}
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    writer.write(_HEADER_LENGTH.pack(len(encoded)))
+    writer.write(encoded)
+    for blob in blobs:
+        writer.write(blob)
+    await writer.drain()
+
+
+async def _read_exactly(reader, size):
+    try:
+        return await reader.readexactly(size)
+    except (asyncio.IncompleteReadError, ConnectionError) as e:
+        raise InferenceIPCError(f"메시지를 읽는 중 연결이 끊겼습니다: {str(e)}")
+
+
+async def read_message(reader):
+    """(헤더, blob 목록) 을 반환. 상대가 메시지 사이에서 연결을 닫았으면 (None, [])"""
+    try:
+        prefix = await reader.readexactly(_HEADER_LENGTH.size)
+    except Exception as e:
+        if getattr(e, "partial", None) == b"":
+            return None, []
+        raise InferenceIPCError(f"메시지를 읽을 수 없습니다: {str(e)}")
+    (length,) = _HEADER_LENGTH.unpack(prefix)
+    if length > MAX_HEADER_BYTES:
+        raise InferenceIPCError(f"헤더가 너무 큽니다: {length} bytes")
+    try:
+        header = json.loads((await _read_exactly(reader, length)).decode("utf-8"))
+    except ValueError as e:
+        raise InferenceIPCError(f"헤더를 해석할 수 없습니다: {str(e)}")
+    blobs = [await _read_exactly(reader, size) for size in header.pop("blobs", [])]
+    return header, blobs
@@ -0,0 +1,118 @@
+"""
+이미지 분류 추론 서버
+
+ImageClassifier 를 별도 프로세스에서 실행하고 유닉스 소켓으로 분류 요청을 받습니다.
+API 서버를 INFERENCE_MODE=remote 로 실행하면 onnxruntime 과 모델을 로드하지 않고
+업로드 이미지를 이 서버로 전달하므로, 가벼운 API 계층과 무거운 추론 계층을 따로 늘릴 수 있습니다.
+디코드, 결과 캐시, 마이크로 배치, 워밍업은 모두 이 서버에서 처리됩니다.
+
+사용 예:
+    INFERENCE_SOCKET=/run/smartfarm/inference.sock python inference_server.py
+    INFERENCE_MODE=remote INFERENCE_SOCKET=/run/smartfarm/inference.sock uvicorn app:app
+"""
+import asyncio
+import logging
+import os
+import socket
+import sys
+
+from fastapi.encoders import jsonable_encoder
+
+import request_timing
+from inference_executor import InferenceOverloaded
+from inference_ipc import InferenceIPCError, read_message, socket_path, write_message
+
+logger = logging.getLogger(__name__)
+
+
+async def _dispatch(classifier, op, args, blobs):
+    if op == "classify":
+        return await classifier.classify_upload(args["crop"], blobs[0])
+    if op == "diagnose":
+        return await classifier.diagnose(args["crop"], blobs[0])
+    if op == "classify_batch":
+        return await classifier.classify_batch(
+            args["crop"], blobs, args.get("filenames"), rejected=args.get("rejected")
+        )
+    if op == "model_stats":
+        return classifier.model_stats()
+    if op == "readiness":
+        return classifier.readiness()
+    raise ValueError(f"알 수 없는 추론 요청입니다: {op}")
+
+
+def make_handler(classifier):
+    async def handle(reader, writer):
+        # 연결 하나로 여러 요청을 순서대로 처리 (클라이언트가 연결을 닫을 때까지)
+        try:
+            while True:
+                header, blobs = await read_message(reader)
+                if header is None:
+                    break
+                timing = request_timing.begin()
+                response = {"id": header.get("id")}
+                try:
+                    result = await _dispatch(classifier, header.get("op"), header.get("args") or {}, blobs)
+                    response.update(ok=True, result=jsonable_encoder(result))
+                except InferenceOverloaded as e:
+                    response.update(ok=False, error_type="overloaded", error=str(e))
+                except (ValueError, KeyError) as e:
+                    response.update(ok=False, error_type="value", error=str(e))
+                except Exception as e:
+                    logger.error(f"추론 요청 처리 오류: {str(e)}")
+                    response.update(ok=False, error_type="error", error=str(e))
+                response["timings"] = dict(timing.stages)
+                await write_message(writer, response)
+        except (InferenceIPCError, ConnectionError) as e:
+            logger.warning(f"추론 요청 연결 오류: {str(e)}")
+        finally:
+            writer.close()
+
+    return handle
+
+
+def _remove_stale_socket(path):
+    """이전 실행이 남긴 소켓 파일 삭제. 다른 서버가 사용 중이면 오류"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"이미 실행 중인 추론 서버가 있습니다: {path}")
+
+
+async def serve(path=None):
+    from image_classifier import classifier
+
+    path = path or socket_path()
+    _remove_stale_socket(path)
+    server = await asyncio.start_unix_server(make_handler(classifier), path=path)
+    os.chmod(path, 0o660)
+    logger.info(f"추론 서버 시작: {path}")
+
+    warmup_task = asyncio.create_task(classifier.warmup_all())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        warmup_task.cancel()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+메모리 예산 기반 LRU 모델 풀
+
+모델은 처음 요청될 때 로드되고, 상주 모델의 메모리 합계가 예산을 넘으면
+가장 오래 사용되지 않은 모델부터 해제합니다. 모델별 메모리 비용은 로드 전후의
+프로세스 RSS 차이로 측정하고, 측정할 수 없으면 아티팩트 파일 크기로 추정합니다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 로드 실패 후 재시도까지 대기 시간 (초)
+LOAD_RETRY_INTERVAL = 30
+
+
+def current_rss_bytes():
+    """현재 프로세스의 RSS (리눅스 외 환경에서는 None)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def process_memory(pid="self"):
+    """
+    프로세스 메모리 (bytes). 리눅스 외 환경이나 권한이 없으면 None
+    rss: 상주 메모리, pss: 공유 페이지를 공유 프로세스 수로 나눠 더한 값,
+    uss: 이 프로세스만 사용하는 메모리 (프로세스를 종료하면 회수되는 양), shared: 다른 프로세스와 공유 중인 메모리
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss_bytes": fields.get("Rss"),
+        "pss_bytes": fields.get("Pss"),
+        "uss_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared_bytes": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+class ModelPool:
+    def __init__(self, loaders, budget_bytes=None, size_hint=None):
+        """
+        loaders: {모델 이름: 인자 없이 모델을 반환하는 함수 (실패 시 None)}
+        budget_bytes: 상주 모델 메모리 예산 (None 또는 0 이면 무제한)
+        size_hint: 모델 이름을 받아 예상 메모리 크기를 반환하는 함수
+        """
+        self._loaders = loaders
+        self.budget_bytes = budget_bytes or None
+        self._size_hint = size_hint
+        self._models = OrderedDict()  # 이름 -> 모델, 마지막 항목이 가장 최근 사용
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stats = {
+            name: {
+                "loads": 0,
+                "evictions": 0,
+                "hits": 0,
+                "cost_bytes": None,
+                "load_seconds": None,
+                "last_used": None,
+                "last_error": None,
+                "failed_at": None,
+            }
+            for name in loaders
+        }
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._models
+
+    def get(self, name):
+        """모델을 반환합니다. 상주하지 않으면 로드하며, 로드 실패 시 None 을 반환합니다."""
+        if name not in self._loaders:
+            raise KeyError(f"등록되지 않은 모델입니다: {name}")
+
+        with self._lock:
+            model = self._touch(name)
+        if model is not None:
+            return model
+
+        # 로드는 한 번에 하나씩 수행해 RSS 차이를 해당 모델의 비용으로 볼 수 있게 함
+        with self._load_lock:
+            with self._lock:
+                model = self._touch(name)
+            if model is not None:
+                return model
+
+            stats = self._stats[name]
+            if stats["failed_at"] and time.time() - stats["failed_at"] < LOAD_RETRY_INTERVAL:
+                return None
+
+            self._make_room(self._estimate_cost(name), keep=name)
+
+            rss_before = current_rss_bytes()
+            started = time.perf_counter()
+            model = self._loaders[name]()
+            elapsed = time.perf_counter() - started
+            rss_after = current_rss_bytes()
+
+            if model is None:
+                stats["failed_at"] = time.time()
+                stats["last_error"] = "로드 실패"
+                return None
+
+            cost = None
+            if rss_before is not None and rss_after is not None and rss_after > rss_before:
+                cost = rss_after - rss_before
+            if cost is None:
+                cost = self._estimate_cost(name)
+
+            with self._lock:
+                self._models[name] = model
+                stats.update({
+                    "loads": stats["loads"] + 1,
+                    "cost_bytes": cost,
+                    "load_seconds": round(elapsed, 3),
+                    "last_used": time.time(),
+                    "last_error": None,
+                    "failed_at": None,
+                })
+            logger.info(f"{name} 모델 로드 완료 ({elapsed:.2f}s, {(cost or 0) / 1024 / 1024:.1f}MB)")
+
+            self._make_room(0, keep=name)
+            return model
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                self._stats[name]["evictions"] += 1
+                logger.info(f"{name} 모델을 메모리에서 해제했습니다")
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(self._stats[name]["cost_bytes"] or 0 for name in self._models)
+
+    def stats(self):
+        with self._lock:
+            resident = list(self._models.keys())
+            models = {
+                name: {
+                    "resident": name in self._models,
+                    **{key: value for key, value in stats.items() if key != "failed_at"},
+                }
+                for name, stats in self._stats.items()
+            }
+        return {
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": sum(models[name]["cost_bytes"] or 0 for name in resident),
+            "resident": resident,  # 오래된 순서
+            "process_rss_bytes": current_rss_bytes(),
+            "models": models,
+        }
+
+    def _touch(self, name):
+        """호출 시 self._lock 을 잡고 있어야 함"""
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+            stats = self._stats[name]
+            stats["hits"] += 1
+            stats["last_used"] = time.time()
+        return model
+
+    def _estimate_cost(self, name):
+        known = self._stats[name]["cost_bytes"]
+        if known:
+            return known
+        if self._size_hint is not None:
+            try:
+                return self._size_hint(name)
+            except Exception:
+                pass
+        return 0
+
+    def _make_room(self, incoming_bytes, keep):
+        """예산을 넘지 않도록 keep 이외의 오래된 모델부터 해제"""
+        if not self.budget_bytes:
+            return
+        while True:
+            with self._lock:
+                used = sum(self._stats[name]["cost_bytes"] or 0 for name in self._models)
+                if used + incoming_bytes <= self.budget_bytes:
+                    return
+                candidates = [name for name in self._models if name != keep]
+                if not candidates:
+                    if used + incoming_bytes > self.budget_bytes:
+                        logger.warning(
+                            f"{keep} 모델 하나만으로 메모리 예산을 초과합니다 "
+                            f"({(used + incoming_bytes) / 1024 / 1024:.1f}MB > "
+                            f"{self.budget_bytes / 1024 / 1024:.1f}MB)"
+                        )
+                    return
+                victim = candidates[0]
+            self.evict(victim)
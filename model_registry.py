@@ -0,0 +1,212 @@
+"""
+이미지 분류 모델 레지스트리
+
+작물별 분류 모델을 코드 없이 선언적으로 기술합니다. 서빙(image_classifier), 모델 저장소(model_store),
+변환/양자화 스크립트는 모두 이 레지스트리를 읽으므로 새 작물은 항목 하나만 추가하면
+로드, 전처리, 마이크로 배치, 결과 캐시, 워밍업과 /predict/{작물} 엔드포인트가 함께 적용됩니다.
+
+항목 필드:
+    display_name: 로그에 쓰는 이름
+    source: 모델 아티팩트 위치 (HuggingFace repo, filename, revision, sha256)
+    input: 입력 크기 [너비, 높이], 레이아웃 (NHWC/NCHW), 정규화 (NORMALIZATIONS 의 키)
+    output: 모델 출력 형식
+        probabilities - 클래스별 확률 (모델 내부 softmax)
+        logits        - 로짓 (서빙에서 softmax 적용)
+        sigmoid       - 시그모이드 단일 출력 (이진 분류)
+    labels: 출력 인덱스 순서의 클래스 레이블
+    message: 분류 응답 메시지
+    diagnose: /diagnose/{작물} 에서 질병 모델로 쓸 수 있는지 (식물 판별 모델 자체는 False)
+    backend, variant: 추론 백엔드(onnx/tflite)와 모델 변형(fp32/int8). None 이면 전역 설정
+    batch: 마이크로 배치 설정 (max_batch_size, max_wait_ms). 없으면 전역 설정
+    session: onnxruntime 세션 설정 덮어쓰기
+    preload: MODEL_PRELOAD 를 지정하지 않았을 때 시작 시 미리 로드할지 여부
+
+MODEL_REGISTRY_PATH 에 JSON 파일을 지정하면 같은 형식의 항목으로 기존 모델 설정을 덮어쓰거나
+새 모델을 추가할 수 있습니다 (기존 모델은 지정한 필드만 바뀝니다).
+"""
+import json
+import os
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# 정규화 이름 -> (mean, std). None 이면 /255 만 적용
+NORMALIZATIONS = {
+    "unit": (None, None),
+    "imagenet": (IMAGENET_MEAN, IMAGENET_STD),
+}
+OUTPUT_TYPES = ("probabilities", "logits", "sigmoid")
+# /diagnose 에서 먼저 실행하는 식물 판별 모델
+PLANT_MODEL = "plant"
+
+DEFAULT_INPUT = {"size": [224, 224], "layout": "NHWC", "normalization": "unit"}
+# MODEL_REGISTRY_PATH 로 덮어쓸 때 키 단위로 합치는 중첩 필드
+NESTED_FIELDS = ("source", "input", "batch", "session")
+
+MODEL_REGISTRY = {
+    "kiwi": {
+        "display_name": "키위",
+        "source": {"repo": "jjiw/densenet161-onnx", "filename": "model.onnx", "revision": "main", "sha256": None},
+        # PyTorch 에서 export 한 DenseNet161 은 ImageNet 정규화 + NCHW 입력
+        "input": {"size": [224, 224], "layout": "NCHW", "normalization": "imagenet"},
+        "output": "logits",
+        "labels": ["잎_점무늬병", "잎_정상", "잎_총채벌레"],
+        "message": "키위 질병 분석이 완료되었습니다",
+        # DenseNet161 은 이미지당 연산량이 커서 배치를 작게 유지
+        "batch": {"max_batch_size": 4},
+    },
+    "chamoe": {
+        "display_name": "참외",
+        "source": {"repo": "jjiw/disease-classifier-onnx", "filename": "model.onnx", "revision": "main", "sha256": None},
+        "output": "logits",
+        "labels": ["노균병", "정상", "흰가루병"],
+        "message": "참외 질병 분석이 완료되었습니다",
+    },
+    "plant": {
+        "display_name": "식물",
+        "source": {"repo": "jjiw/plant-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "output": "sigmoid",
+        "labels": ["비식물", "식물"],
+        "message": "식물 분류가 완료되었습니다",
+        "diagnose": False,
+    },
+    "strawberry": {
+        "display_name": "딸기",
+        "source": {"repo": "ro981009/strawberry-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": ["딸기 잎끝마름", "정상"],
+        "message": "딸기 질병 분석이 완료되었습니다",
+    },
+    "apple": {
+        "display_name": "사과",
+        "source": {"repo": "ro981009/apple-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": ["사과 검은무늬병", "사과 흑색 부패병", "사과 삼나무 녹병", "정상"],
+        "message": "사과 질병 분석이 완료되었습니다",
+    },
+    "potato": {
+        "display_name": "감자",
+        "source": {"repo": "ro981009/potato-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": ["감자 잎마름병", "감자 역병", "정상"],
+        "message": "감자 질병 분석이 완료되었습니다",
+    },
+    "tomato": {
+        "display_name": "토마토",
+        "source": {"repo": "ro981009/tomato-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": [
+            "토마토 박테리아성 반점병",
+            "토마토 잎마름병",
+            "토마토 역병",
+            "토마토 잎곰팡이병",
+            "토마토 세프토이라 잎반점병",
+            "토마토 거미 진드기 피해",
+            "토마토 표적반점병",
+            "토마토 황화 잎말림 바이러스",
+            "토마토 모자이크 바이러스",
+            "정상",
+        ],
+        "message": "토마토 질병 분석이 완료되었습니다",
+    },
+    "grape": {
+        "display_name": "포도",
+        "source": {"repo": "ro981009/grape-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": ["포도 에스카병", "포도 흑색 부패병", "포도 잎마름병", "정상"],
+        "message": "포도 질병 분석이 완료되었습니다",
+    },
+    "corn": {
+        "display_name": "옥수수",
+        "source": {"repo": "ro981009/corn-classifier-h5", "filename": "model.h5", "revision": "main", "sha256": None},
+        "labels": ["옥수수 세르코스포라 잎반점병", "옥수수 일반 녹병", "옥수수 북부 잎마름병", "정상"],
+        "message": "옥수수 질병 분석이 완료되었습니다",
+    },
+}
+
+
+class ModelRegistryError(Exception):
+    """레지스트리 항목이 올바르지 않은 경우"""
+
+
+def _normalize_entry(name, entry):
+    """기본값을 채우고 필수 필드를 검사한 항목을 반환"""
+    entry = {
+        "display_name": name,
+        "output": "probabilities",
+        "diagnose": True,
+        "backend": None,
+        "variant": None,
+        "batch": {},
+        "session": {},
+        "preload": False,
+        **entry,
+    }
+    entry["input"] = {**DEFAULT_INPUT, **entry.get("input", {})}
+    entry["input"]["size"] = tuple(entry["input"]["size"])
+    for field in ("source", "labels", "message"):
+        if not entry.get(field):
+            raise ModelRegistryError(f"{name} 모델에 {field} 항목이 없습니다")
+    for field in ("repo", "filename", "revision"):
+        if not entry["source"].get(field):
+            raise ModelRegistryError(f"{name} 모델의 source 에 {field} 항목이 없습니다")
+    entry["source"] = {"sha256": None, **entry["source"]}
+    if entry["output"] not in OUTPUT_TYPES:
+        raise ModelRegistryError(f"{name} 모델의 알 수 없는 출력 형식입니다: {entry['output']}")
+    if entry["input"]["normalization"] not in NORMALIZATIONS:
+        raise ModelRegistryError(f"{name} 모델의 알 수 없는 정규화입니다: {entry['input']['normalization']}")
+    if entry["output"] == "sigmoid" and len(entry["labels"]) != 2:
+        raise ModelRegistryError(f"{name} 모델은 시그모이드 출력이라 레이블이 2개여야 합니다")
+    return entry
+
+
+def _merge_entry(base, override):
+    """기존 항목에 덮어쓰기 항목을 합침. 중첩 필드(source, input 등)도 지정한 키만 바뀜"""
+    merged = {**base, **override}
+    for field in NESTED_FIELDS:
+        if isinstance(base.get(field), dict) and isinstance(override.get(field), dict):
+            merged[field] = {**base[field], **override[field]}
+    return merged
+
+
+def _load_registry():
+    entries = {name: dict(entry) for name, entry in MODEL_REGISTRY.items()}
+    path = os.getenv("MODEL_REGISTRY_PATH")
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for name, entry in overrides.items():
+            entries[name] = _merge_entry(entries.get(name, {}), entry)
+    return {name: _normalize_entry(name, entry) for name, entry in entries.items()}
+
+
+_registry = _load_registry()
+
+
+def model_names():
+    return list(_registry.keys())
+
+
+def get_spec(name):
+    if name not in _registry:
+        raise ModelRegistryError(f"등록되지 않은 모델입니다: {name}")
+    return _registry[name]
+
+
+def artifact_sources():
+    """model_store 가 사용할 모델별 원격 위치"""
+    return {name: dict(spec["source"]) for name, spec in _registry.items()}
+
+
+def preprocess_config(name):
+    """ImagePreprocessor 인자 (size, layout, mean, std)"""
+    spec = get_spec(name)["input"]
+    mean, std = NORMALIZATIONS[spec["normalization"]]
+    return {"size": spec["size"], "layout": spec["layout"], "mean": mean, "std": std}
+
+
+def is_binary(name):
+    return get_spec(name)["output"] == "sigmoid"
+
+
+def needs_softmax(name):
+    return get_spec(name)["output"] == "logits"
+
+
+def preload_names():
+    return [name for name, spec in _registry.items() if spec["preload"]]
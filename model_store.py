@@ -0,0 +1,418 @@
+"""
+이미지 분류 모델 아티팩트 로컬 저장소
+
+HuggingFace 에서 받은 모델 파일을 버전별 디렉토리에 보관하고
+sha256 체크섬으로 검증합니다. 워커가 재시작될 때마다 모델을 다시 받지 않고
+로컬 디스크에서 바로 읽으므로 오프라인 환경에서도 서버를 띄울 수 있습니다.
+
+디렉토리 구조:
+    $MODEL_CACHE_DIR/<모델 이름>/<revision>/<파일명>
+    $MODEL_CACHE_DIR/<모델 이름>/<revision>/manifest.json
+
+사용 예:
+    python model_store.py prefetch            # 전체 모델 미리 받기
+    python model_store.py prefetch kiwi apple # 일부 모델만 받기
+    python model_store.py verify              # 체크섬 검증
+    python model_store.py list                # 설치 상태 출력
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import requests
+
+import model_registry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_DIR = os.getenv(
+    "MODEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
+)
+# 1 이면 네트워크를 전혀 사용하지 않고 로컬 캐시만 사용합니다
+MODEL_STORE_OFFLINE = os.getenv("MODEL_STORE_OFFLINE", "0") == "1"
+# 0 이면 로드 시 sha256 검증을 건너뜁니다 (설치 시에는 항상 검증)
+MODEL_STORE_VERIFY = os.getenv("MODEL_STORE_VERIFY", "1") == "1"
+# 1 이면 커밋 해시 revision 과 sha256 이 고정되지 않은 모델은 설치하지 않습니다
+MODEL_STORE_REQUIRE_PINNED = os.getenv("MODEL_STORE_REQUIRE_PINNED", "0") == "1"
+
+# Keras(.h5) 모델을 ONNX 로 변환해 저장할 때의 파일명 (convert_models.py)
+CONVERTED_ONNX_FILENAME = "model.onnx"
+# INT8 양자화 모델 파일명 (quantize_models.py)
+QUANTIZED_ONNX_FILENAME = "model.int8.onnx"
+# Keras 모델을 TFLite 로 변환해 저장할 때의 파일명 (convert_models.py --backend tflite)
+TFLITE_FILENAME = "model.tflite"
+
+HF_BASE_URL = "https://huggingface.co"
+DOWNLOAD_TIMEOUT = 60
+CHUNK_SIZE = 1024 * 1024
+
+# 모델별 원격 위치와 버전 (model_registry 의 source 항목)
+# revision 은 HuggingFace 브랜치명 또는 커밋 해시입니다. 모델을 갱신하려면
+# revision 을 바꾸면 새 디렉토리에 설치되고 이전 버전은 그대로 남습니다.
+# sha256 을 지정하면 다운로드한 파일이 해당 값과 일치해야만 설치됩니다.
+# 브랜치명(main 등)은 원격에서 내용이 바뀔 수 있고 sha256 이 없으면 받은 파일이 의도한 모델인지
+# 확인할 수 없으므로, 고정되지 않은 모델은 설치 때마다 경고합니다 (MODEL_STORE_REQUIRE_PINNED=1 이면 오류).
+MODEL_ARTIFACTS = model_registry.artifact_sources()
+
+_COMMIT_HASH_CHARS = set("0123456789abcdef")
+
+
+class ModelStoreError(Exception):
+    """모델 아티팩트를 찾을 수 없거나 검증에 실패한 경우"""
+
+
+def _get_artifact(name):
+    if name not in MODEL_ARTIFACTS:
+        raise ModelStoreError(f"등록되지 않은 모델입니다: {name}")
+    return MODEL_ARTIFACTS[name]
+
+
+def unpinned_fields(name):
+    """고정되지 않은 source 항목 목록 (revision 이 커밋 해시가 아니거나 sha256 이 없는 경우)"""
+    artifact = _get_artifact(name)
+    fields = []
+    revision = artifact["revision"].lower()
+    if len(revision) != 40 or not set(revision) <= _COMMIT_HASH_CHARS:
+        fields.append("revision")
+    if not artifact["sha256"]:
+        fields.append("sha256")
+    return fields
+
+
+def _check_pinned(name):
+    fields = unpinned_fields(name)
+    if not fields:
+        return
+    message = (
+        f"{name} 모델의 {', '.join(fields)} 이(가) 고정되어 있지 않아 받은 파일이 의도한 모델인지 검증할 수 없습니다. "
+        f"model_registry 의 source 에 커밋 해시 revision 과 sha256 을 지정하세요"
+    )
+    if MODEL_STORE_REQUIRE_PINNED:
+        raise ModelStoreError(message)
+    logger.warning(message)
+
+
+def artifact_url(name):
+    artifact = _get_artifact(name)
+    return f"{HF_BASE_URL}/{artifact['repo']}/resolve/{artifact['revision']}/{artifact['filename']}"
+
+
+def artifact_dir(name):
+    artifact = _get_artifact(name)
+    return os.path.join(MODEL_CACHE_DIR, name, artifact["revision"])
+
+
+def artifact_path(name):
+    return os.path.join(artifact_dir(name), _get_artifact(name)["filename"])
+
+
+def model_version(name):
+    """응답 캐시 등에서 사용할 모델 버전 문자열 (revision + 체크섬 앞자리)"""
+    manifest = read_manifest(name) or {}
+    sha256 = manifest.get("sha256") or ""
+    return f"{_get_artifact(name)['revision']}:{sha256[:12]}"
+
+
+def _manifest_path(name):
+    return os.path.join(artifact_dir(name), "manifest.json")
+
+
+def read_manifest(name):
+    try:
+        with open(_manifest_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, data):
+    """같은 디렉토리의 임시 파일에 쓴 뒤 os.replace 로 교체"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _install_lock(name):
+    """여러 워커가 동시에 같은 모델을 받지 않도록 파일 잠금"""
+    os.makedirs(artifact_dir(name), exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(artifact_dir(name), ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def is_installed(name, verify=False):
+    path = artifact_path(name)
+    manifest = read_manifest(name)
+    if manifest is None or not os.path.exists(path):
+        return False
+    # 레지스트리에 고정한 sha256 과 다른 파일이 설치되어 있으면 (고정 전에 받은 파일 등) 다시 받아야 함
+    expected = _get_artifact(name)["sha256"]
+    if expected and manifest.get("sha256") != expected:
+        return False
+    if os.path.getsize(path) != manifest.get("size"):
+        return False
+    if verify and _sha256(path) != manifest.get("sha256"):
+        return False
+    return True
+
+
+def install(name, force=False):
+    """모델을 내려받아 검증한 뒤 원자적으로 설치하고 경로를 반환합니다."""
+    artifact = _get_artifact(name)
+    path = artifact_path(name)
+
+    with _install_lock(name):
+        # 잠금을 기다리는 동안 다른 워커가 설치를 끝냈을 수 있음
+        if not force and is_installed(name):
+            return path
+
+        if MODEL_STORE_OFFLINE:
+            raise ModelStoreError(f"오프라인 모드에서 {name} 모델이 로컬에 없습니다: {path}")
+        _check_pinned(name)
+
+        url = artifact_url(name)
+        logger.info(f"{name} 모델 다운로드 시작: {url}")
+        fd, tmp_path = tempfile.mkstemp(dir=artifact_dir(name), prefix=".download-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            sha256 = digest.hexdigest()
+            if not artifact["sha256"]:
+                logger.warning(f"{name} 모델은 기대 sha256 이 없어 받은 파일({sha256})을 그대로 설치합니다")
+            elif artifact["sha256"] != sha256:
+                raise ModelStoreError(
+                    f"{name} 모델 체크섬 불일치: 예상 {artifact['sha256']}, 실제 {sha256}"
+                )
+
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        manifest = {
+            "name": name,
+            "url": url,
+            "revision": artifact["revision"],
+            "filename": artifact["filename"],
+            "sha256": sha256,
+            "size": size,
+            "installed_at": datetime.now().isoformat(),
+        }
+        derived = _carry_over_derived(name, sha256)
+        if derived:
+            manifest["derived"] = derived
+        _write_atomic(_manifest_path(name), json.dumps(manifest, indent=2).encode("utf-8"))
+        logger.info(f"{name} 모델 설치 완료 ({size / 1024 / 1024:.1f}MB, sha256={sha256[:12]})")
+        return path
+
+
+def _carry_over_derived(name, source_sha256):
+    """
+    다시 설치한 원본과 체크섬이 같은 파생 아티팩트 기록은 새 매니페스트로 옮기고,
+    다른 원본으로 만든 파생 아티팩트 파일은 삭제합니다. 호출 시 설치 잠금을 잡고 있어야 함
+    """
+    previous = (read_manifest(name) or {}).get("derived", {})
+    derived = {}
+    for filename, entry in previous.items():
+        if entry.get("source_sha256") == source_sha256:
+            derived[filename] = entry
+            continue
+        path = derived_path(name, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"{name} 원본이 바뀌어 파생 아티팩트를 삭제했습니다: {filename}")
+    return derived
+
+
+def ensure(name):
+    """
+    로컬에 검증된 모델이 있으면 그 경로를, 없으면 내려받아 설치한 경로를 반환합니다.
+    체크섬이 맞지 않는 파일은 다시 받습니다 (오프라인 모드에서는 오류).
+    """
+    if is_installed(name, verify=MODEL_STORE_VERIFY):
+        return artifact_path(name)
+    if read_manifest(name) is not None:
+        logger.warning(f"{name} 모델 파일이 손상되었거나 불완전합니다. 다시 설치합니다")
+        return install(name, force=True)
+    return install(name)
+
+
+def derived_path(name, filename):
+    return os.path.join(artifact_dir(name), filename)
+
+
+def has_derived(name, filename, verify=False):
+    """원본으로부터 만든 파생 아티팩트(ONNX 변환본 등)가 현재 원본 기준으로 유효한지 확인"""
+    manifest = read_manifest(name) or {}
+    entry = manifest.get("derived", {}).get(filename)
+    path = derived_path(name, filename)
+    if entry is None or not os.path.exists(path):
+        return False
+    # 원본이 다시 설치되어 체크섬이 바뀌었다면 파생 아티팩트도 다시 만들어야 함
+    if entry.get("source_sha256") != manifest.get("sha256"):
+        return False
+    if os.path.getsize(path) != entry.get("size"):
+        return False
+    if verify and _sha256(path) != entry.get("sha256"):
+        return False
+    return True
+
+
+def install_derived(name, src_path, filename, metadata=None):
+    """변환/양자화 등으로 만든 파생 아티팩트를 원본과 같은 버전 디렉토리에 원자적으로 설치"""
+    with _install_lock(name):
+        manifest = read_manifest(name)
+        if manifest is None:
+            raise ModelStoreError(f"{name} 원본 모델이 설치되어 있지 않습니다")
+
+        path = derived_path(name, filename)
+        fd, tmp_path = tempfile.mkstemp(dir=artifact_dir(name), prefix=".derived-")
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            sha256 = _sha256(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        manifest.setdefault("derived", {})[filename] = {
+            "sha256": sha256,
+            "size": size,
+            "source_sha256": manifest["sha256"],
+            "installed_at": datetime.now().isoformat(),
+            **(metadata or {}),
+        }
+        _write_atomic(_manifest_path(name), json.dumps(manifest, indent=2).encode("utf-8"))
+        logger.info(f"{name} 파생 아티팩트 설치 완료: {filename} (sha256={sha256[:12]})")
+        return path
+
+
+def ensure_derived(name, filename):
+    """검증된 파생 아티팩트 경로를 반환합니다. 파생 아티팩트는 내려받지 않고 로컬에서만 찾습니다."""
+    if has_derived(name, filename, verify=MODEL_STORE_VERIFY):
+        return derived_path(name, filename)
+    raise ModelStoreError(f"{name} 모델의 {filename} 이(가) 없거나 원본과 맞지 않습니다: {derived_path(name, filename)}")
+
+
+def is_keras_model(name):
+    return _get_artifact(name)["filename"].endswith(".h5")
+
+
+def onnx_path(name):
+    """
+    onnxruntime 으로 서빙할 모델 경로.
+    원래 ONNX 로 배포된 모델은 원본을, Keras 모델은 convert_models.py 로 변환한 파일을 사용합니다.
+    """
+    if is_keras_model(name):
+        return ensure_derived(name, CONVERTED_ONNX_FILENAME)
+    return ensure(name)
+
+
+def prefetch(names=None, force=False):
+    """지정한 모델(기본값: 전체)을 미리 받아 둡니다. 실패한 모델 이름 목록을 반환합니다."""
+    failed = []
+    for name in names or MODEL_ARTIFACTS.keys():
+        try:
+            install(name, force=force)
+        except Exception as e:
+            logger.error(f"{name} 모델 설치 실패: {str(e)}")
+            failed.append(name)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이미지 분류 모델 로컬 저장소 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prefetch_parser = subparsers.add_parser("prefetch", help="모델을 미리 내려받아 설치")
+    prefetch_parser.add_argument("names", nargs="*", help="모델 이름 (기본값: 전체)")
+    prefetch_parser.add_argument("--force", action="store_true", help="이미 설치되어 있어도 다시 받기")
+
+    verify_parser = subparsers.add_parser("verify", help="설치된 모델의 체크섬 검증")
+    verify_parser.add_argument("names", nargs="*", help="모델 이름 (기본값: 전체)")
+
+    subparsers.add_parser("list", help="모델 설치 상태 출력")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "prefetch":
+        failed = prefetch(args.names, force=args.force)
+        return 1 if failed else 0
+
+    if args.command == "verify":
+        failed = [name for name in (args.names or MODEL_ARTIFACTS.keys())
+                  if not is_installed(name, verify=True)]
+        for name in failed:
+            print(f"검증 실패: {name} ({artifact_path(name)})")
+        for name in args.names or MODEL_ARTIFACTS.keys():
+            fields = unpinned_fields(name)
+            if fields:
+                print(f"고정되지 않음: {name} ({', '.join(fields)})")
+                if MODEL_STORE_REQUIRE_PINNED and name not in failed:
+                    failed.append(name)
+        return 1 if failed else 0
+
+    for name in MODEL_ARTIFACTS:
+        manifest = read_manifest(name)
+        status = "설치됨" if is_installed(name) else "없음"
+        sha256 = manifest["sha256"][:12] if manifest else "-"
+        print(f"{name:<12} {MODEL_ARTIFACTS[name]['revision']:<10} {status:<6} {sha256}  {artifact_path(name)}")
+        for filename, entry in (manifest or {}).get("derived", {}).items():
+            derived_status = "설치됨" if has_derived(name, filename) else "만료"
+            print(f"{'':<12} {'':<10} {derived_status:<6} {entry['sha256'][:12]}  {derived_path(name, filename)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
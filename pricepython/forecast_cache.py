@@ -0,0 +1,95 @@
+"""
+작물 가격 예측 결과 캐시
+
+예측 특성은 날짜와 latest_data.csv 에만 의존하므로 같은 날 같은 작물의 예측 결과는 하루 종일 같습니다.
+(작물, 날짜, 모델 버전, 예측 일수) 를 키로 결과를 보관해 대시보드의 반복 요청은 모델을 실행하지 않고 반환합니다.
+날짜가 바뀌면 전날 결과를 모두 비우고, 모델을 다시 로드하면 버전이 바뀌어 해당 작물의 이전 결과는 쓰이지 않습니다.
+호출한 쪽이 결과를 수정해도 캐시에 영향이 없도록 저장과 반환 시 복사본을 사용합니다.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+
+class ForecastCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()  # 키 -> 예측 결과 dict, 마지막 항목이 가장 최근 사용
+        self._day = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(crop, day, version, horizon_days):
+        return (crop, day.isoformat(), version, horizon_days)
+
+    def _roll_day(self, today):
+        """
+        호출 시 self._lock 을 잡고 있어야 함. 날짜가 바뀌었으면 이전 날짜의 결과를 모두 삭제.
+        자정 전에 시작한 요청의 날짜(today < 현재 날짜)이면 False 를 반환하며 캐시는 바꾸지 않음
+        """
+        if self._day is not None and today < self._day:
+            return False
+        if self._day != today:
+            if self._entries:
+                self._stats["invalidations"] += len(self._entries)
+                self._entries.clear()
+            self._day = today
+        return True
+
+    def get(self, crop, version, horizon_days, today=None):
+        today = today or date.today()
+        key = self.make_key(crop, today, version, horizon_days)
+        with self._lock:
+            value = self._entries.get(key) if self._roll_day(today) else None
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return copy.deepcopy(value)
+
+    def put(self, crop, version, horizon_days, value, today=None):
+        today = today or date.today()
+        key = self.make_key(crop, today, version, horizon_days)
+        with self._lock:
+            if not self._roll_day(today):
+                return
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, crop=None):
+        """crop 의 결과를 삭제 (모델을 다시 로드한 경우). crop 이 None 이면 전체 삭제"""
+        with self._lock:
+            keys = [key for key in self._entries if crop is None or key[0] == crop]
+            for key in keys:
+                del self._entries[key]
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            crops = {}
+            for crop, _, _, _ in self._entries:
+                crops[crop] = crops.get(crop, 0) + 1
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "day": self._day.isoformat() if self._day else None,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                "entries_by_crop": crops,
+                **self._stats,
+            }
+
+
+def default_forecast_cache():
+    if os.getenv("PRICE_FORECAST_CACHE_ENABLED", "1") != "1":
+        return None
+    return ForecastCache(max_entries=int(os.getenv("PRICE_FORECAST_CACHE_SIZE", "256")))
@@ -7,18 +7,64 @@ from sklearn.metrics import mean_squared_error, r2_score
 import sys
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import joblib
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Mapping
+
+from .forecast_cache import default_forecast_cache
+
+logger = logging.getLogger(__name__)
+
+# 예측 기간 (오늘 포함 일수). 응답은 오늘(current), 내일(tomorrow), 그 이후(weekly) 로 나뉨
+DEFAULT_HORIZON_DAYS = int(os.getenv("PRICE_HORIZON_DAYS", "7"))
+MIN_HORIZON_DAYS = 2
+MAX_HORIZON_DAYS = 30
+
+# metadata.txt 에 기록된 학습 시 특성 순서
+FEATURES = [
+    'month', 'day', 'dayofweek', 'season',
+    'price_ma3', 'price_ma7', 'price_ma30',
+    'price_std3', 'price_std7', 'price_std30',
+    'price_change', 'price_change_ma7',
+    'month_sin', 'month_cos'
+]
+# 예측 날짜에 따라 달라지는 특성 (build_features 에서 이 순서로 채움)
+DATE_FEATURES = ['month', 'day', 'dayofweek', 'season', 'month_sin', 'month_cos']
+# 월 -> 계절 (봄 1, 여름 2, 가을 3, 겨울 4). 인덱스 0 은 사용하지 않음
+SEASON_BY_MONTH = np.array([0, 4, 4, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4])
+
+# 같은 날 같은 작물의 예측 결과 캐시 (PRICE_FORECAST_CACHE_ENABLED=0 이면 None)
+forecast_cache = default_forecast_cache()
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODEL_ARTIFACT_FILES = ('model.joblib', 'scaler.joblib', 'latest_data.csv')
+# 모델 파일 변경 확인 주기 (초, 0 이면 감시하지 않고 /api/predictions/reload 로만 다시 로드)
+PRICE_MODEL_WATCH_INTERVAL = float(os.getenv("PRICE_MODEL_WATCH_INTERVAL", "0"))
+
+def model_dir_for(crop_name):
+    return os.path.join(MODELS_DIR, crop_name)
+
+def artifact_version(model_dir):
+    """모델, 스케일러, 최근 데이터 파일의 크기와 수정 시각으로 만든 모델 버전"""
+    stamps = []
+    for filename in MODEL_ARTIFACT_FILES:
+        stat = os.stat(os.path.join(model_dir, filename))
+        stamps.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha256("|".join(stamps).encode()).hexdigest()[:12]
 
 def create_price_predictor(crop_name):
     try:
         import numpy as np
         
         # 모델 디렉토리 경로 설정
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_dir = os.path.join(current_dir, 'models', crop_name)
+        model_dir = model_dir_for(crop_name)
         
-        # 저장된 모델과 스케일러 로드
+        # 저장된 모델과 스케일러 로드 (버전은 로드 직전 파일 기준)
+        version = artifact_version(model_dir)
         model = joblib.load(os.path.join(model_dir, 'model.joblib'))
         scaler = joblib.load(os.path.join(model_dir, 'scaler.joblib'))
         
@@ -28,126 +74,303 @@ def create_price_predictor(crop_name):
                 metadata = f.readlines()
                 r2_score = float([line for line in metadata if 'R2 Score:' in line][0].split(':')[1].strip())
         except Exception as e:
-            print(f"metadata 읽기 실패: {str(e)}")
+            logger.warning(f"{crop_name} metadata 읽기 실패: {str(e)}")
             r2_score = 0.85  # 기본값
         
-        # 모델의 특성 이름 확인 및 출력 (디버깅용)
+        # 모델의 특성 이름 확인 (디버깅용)
         if hasattr(model, 'feature_names_in_'):
-            print(f"{crop_name} 모델의 특성:", model.feature_names_in_)
+            logger.debug(f"{crop_name} 모델의 특성: {list(model.feature_names_in_)}")
         
         # 최근 데이터 로드
         latest_data = pd.read_csv(os.path.join(model_dir, 'latest_data.csv'))
         latest_data['date'] = pd.to_datetime(latest_data['date'])
         latest_price = latest_data[crop_name].iloc[0]
-        
-        def predict_prices(weather_data=None):
+
+        # 날짜와 무관한 특성(최근 가격, 이동 표준편차)은 로드할 때 한 번만 계산
+        price_history = latest_data[crop_name]
+        static_features = {
+            'price_ma3': latest_price,
+            'price_ma7': latest_price,
+            'price_ma30': latest_price,
+            'price_std3': price_history.head(3).std(),
+            'price_std7': price_history.head(7).std(),
+            'price_std30': price_history.head(30).std(),
+            'price_change': 0,
+            'price_change_ma7': 0,
+        }
+        static_columns = [i for i, name in enumerate(FEATURES) if name in static_features]
+        static_row = np.array([static_features[FEATURES[i]] for i in static_columns], dtype=np.float64)
+        date_columns = [FEATURES.index(name) for name in DATE_FEATURES]
+        # 스케일러가 DataFrame 으로 학습된 경우 특성 이름을 맞춰 전달 (이름 불일치 경고 방지)
+        scaler_uses_names = hasattr(scaler, 'feature_names_in_')
+
+        def build_features(dates):
+            """예측 기간 전체의 특성 행렬 (날짜 수, 특성 수). 열 순서는 metadata.txt 의 특성 순서"""
+            months = np.array([d.month for d in dates])
+            features = np.empty((len(dates), len(FEATURES)), dtype=np.float64)
+            features[:, static_columns] = static_row
+            features[:, date_columns] = np.column_stack([
+                months,
+                [d.day for d in dates],
+                [d.weekday() for d in dates],
+                SEASON_BY_MONTH[months],
+                np.sin(2 * np.pi * months / 12),
+                np.cos(2 * np.pi * months / 12),
+            ])
+            if scaler_uses_names:
+                return scaler.transform(pd.DataFrame(features, columns=FEATURES))
+            return scaler.transform(features)
+
+        def predict_prices(weather_data=None, horizon_days=DEFAULT_HORIZON_DAYS, start_date=None):
             try:
-                predictions = {
-                    'current': {},
-                    'tomorrow': {},
-                    'weekly': []
-                }
-                
-                current_date = datetime.now()
-                
-                def prepare_prediction_data(target_date):
-                    # metadata.txt에서 확인된 순서와 정확히 일치하는 특성 생성
-                    features = [
-                        'month', 'day', 'dayofweek', 'season',
-                        'price_ma3', 'price_ma7', 'price_ma30',
-                        'price_std3', 'price_std7', 'price_std30',
-                        'price_change', 'price_change_ma7',
-                        'month_sin', 'month_cos'
-                    ]
-                    
-                    # 데이터 준비
-                    new_data = pd.DataFrame({
-                        'month': [target_date.month],
-                        'day': [target_date.day],
-                        'dayofweek': [target_date.weekday()],
-                        'season': [1 if target_date.month in [3,4,5] else 2 if target_date.month in [6,7,8] 
-                                else 3 if target_date.month in [9,10,11] else 4],
-                        'price_ma3': [latest_price],
-                        'price_ma7': [latest_price],
-                        'price_ma30': [latest_price],
-                        'price_std3': [latest_data[crop_name].head(3).std()],
-                        'price_std7': [latest_data[crop_name].head(7).std()],
-                        'price_std30': [latest_data[crop_name].head(30).std()],
-                        'price_change': [0],
-                        'price_change_ma7': [0],
-                        'month_sin': [np.sin(2 * np.pi * target_date.month/12)],
-                        'month_cos': [np.cos(2 * np.pi * target_date.month/12)]
-                    })
-                    
-                    # 특성 순서 맞추기
-                    new_data = new_data[features]
-                    return scaler.transform(new_data)
-                
-                # 현재 가격 예측
-                current_data = prepare_prediction_data(current_date)
-                current_price = model.predict(current_data)[0]
-                predictions['current'] = {
-                    'price': round(current_price, 2),
-                    'r2_score': r2_score
-                }
-                
-                # 내일 가격 예측
-                tomorrow_date = current_date + timedelta(days=1)
-                tomorrow_data = prepare_prediction_data(tomorrow_date)
-                tomorrow_price = model.predict(tomorrow_data)[0]
-                predictions['tomorrow'] = {
-                    'price': round(tomorrow_price, 2),
-                    'r2_score': r2_score
-                }
-                
-                # 주간 예측
-                for i in range(2, 7):
-                    future_date = current_date + timedelta(days=i)
-                    future_data = prepare_prediction_data(future_date)
-                    future_price = model.predict(future_data)[0]
-                    predictions['weekly'].append({
-                        'price': round(future_price, 2),
+                # 캐시 키와 같은 날짜로 예측하도록 호출한 쪽에서 정한 시작 날짜를 사용
+                current_date = start_date or date.today()
+                dates = [current_date + timedelta(days=i) for i in range(horizon_days)]
+                # 오늘부터 horizon_days 일 동안의 가격을 한 번의 predict 로 계산
+                prices = model.predict(build_features(dates))
+                daily = [
+                    {
+                        'date': date.strftime('%Y-%m-%d'),
+                        'price': round(float(price), 2),
                         'r2_score': r2_score
-                    })
-                
-                return predictions
-                
+                    }
+                    for date, price in zip(dates, prices)
+                ]
+
+                return {
+                    'current': daily[0],
+                    'tomorrow': daily[1],
+                    'weekly': daily[2:]
+                }
+
             except Exception as e:
-                print(f"예측 중 오류 발생: {str(e)}")
+                logger.error(f"{crop_name} 예측 중 오류 발생: {str(e)}")
                 return {"error": str(e)}
         
+        predict_prices.version = version
         return predict_prices
         
     except Exception as e:
-        print(f"모델 로드 중 오류 발생: {str(e)}")
+        logger.error(f"{crop_name} 모델 로드 중 오류 발생: {str(e)}")
         return None
 
-# 각 작물별 예측 함수 생성
-predict_prices_dict = {
-    'apple': create_price_predictor('apple'),
-    'broccoli': create_price_predictor('broccoli'),
-    'cabbage': create_price_predictor('cabbage'),
-    'carrot': create_price_predictor('carrot'),
-    'cucumber': create_price_predictor('cucumber'),
-    'onion': create_price_predictor('onion'),
-    'potato': create_price_predictor('potato'),
-    'spinach': create_price_predictor('spinach'),
-    'strawberry': create_price_predictor('strawberry'),
-    'tomato': create_price_predictor('tomato')
-}
-
-def predict_prices(crop_name, weather_data=None):
+PRICE_CROPS = [
+    'apple', 'broccoli', 'cabbage', 'carrot', 'cucumber',
+    'onion', 'potato', 'spinach', 'strawberry', 'tomato'
+]
+# 서버 시작 시 미리 로드할 작물 (쉼표 구분, "all" 이면 전체). 나머지는 첫 예측 요청 때 로드
+# import 자체는 모델을 로드하지 않으며, app.py 의 시작 훅이 predict_prices_dict.preload 를 스레드에서 호출
+PRICE_MODEL_PRELOAD = [
+    name.strip() for name in os.getenv("PRICE_MODEL_PRELOAD", "").split(",") if name.strip()
+]
+if PRICE_MODEL_PRELOAD == ["all"]:
+    PRICE_MODEL_PRELOAD = list(PRICE_CROPS)
+
+
+def smoke_test(predictor):
+    """새로 로드한 예측 함수를 교체 전에 검증. 문제가 있으면 오류 메시지, 정상이면 None"""
+    if predictor is None:
+        return "모델을 로드할 수 없습니다"
+    result = predictor(None, MIN_HORIZON_DAYS)
+    if 'error' in result:
+        return result['error']
+    prices = [result['current']['price'], result['tomorrow']['price']]
+    if not all(np.isfinite(price) and price >= 0 for price in prices):
+        return f"예측 가격이 올바르지 않습니다: {prices}"
+    return None
+
+
+class LazyPredictors(Mapping):
+    """
+    작물 이름 -> 예측 함수. 처음 조회할 때 해당 작물의 모델만 로드합니다.
+    같은 작물을 동시에 처음 요청해도 작물별 잠금으로 한 번만 로드하며, 로드에 실패한 작물은 None 입니다.
+    reload 는 새 모델을 검증한 뒤 참조만 바꾸므로 이전 예측 함수를 받은 요청은 그대로 끝까지 실행됩니다.
+    """
+
+    def __init__(self, crops, factory, validate=smoke_test):
+        self._crops = list(crops)
+        self._factory = factory
+        self._validate = validate
+        self._predictors = {}
+        self._locks = {crop: threading.Lock() for crop in self._crops}
+
+    def __getitem__(self, crop):
+        if crop not in self._locks:
+            raise KeyError(crop)
+        if crop in self._predictors:
+            return self._predictors[crop]
+        with self._locks[crop]:
+            if crop not in self._predictors:
+                self._predictors[crop] = self._factory(crop)
+            return self._predictors[crop]
+
+    def __contains__(self, crop):
+        # Mapping 기본 구현은 __getitem__ 을 호출해 모델을 로드하므로 이름만 확인
+        return crop in self._locks
+
+    def __iter__(self):
+        return iter(self._crops)
+
+    def __len__(self):
+        return len(self._crops)
+
+    def loaded(self):
+        return [crop for crop in self._crops if crop in self._predictors]
+
+    def versions(self):
+        """로드된 작물별 현재 모델 버전 (로드에 실패한 작물은 None)"""
+        return {
+            crop: getattr(self._predictors[crop], 'version', None)
+            for crop in self.loaded()
+        }
+
+    def reload(self, crop):
+        """
+        crop 모델을 새 파일로 다시 로드합니다. 새 모델이 smoke 예측을 통과해야 교체되며,
+        실패하면 기존 모델을 그대로 사용합니다.
+        """
+        if crop not in self:
+            raise KeyError(crop)
+        with self._locks[crop]:
+            previous = self._predictors.get(crop)
+            previous_version = getattr(previous, 'version', None)
+            started = time.perf_counter()
+            candidate = self._factory(crop)
+            error = self._validate(candidate)
+            result = {
+                'crop': crop,
+                'previous_version': previous_version,
+                'version': getattr(candidate, 'version', None),
+                'load_ms': round((time.perf_counter() - started) * 1000, 3),
+            }
+            if error is not None:
+                logger.error(f"{crop} 가격 예측 모델 교체 실패, 기존 모델 유지: {error}")
+                return {**result, 'reloaded': False, 'error': error}
+            # 참조 교체는 원자적이므로 진행 중인 요청은 이전 모델로, 이후 요청은 새 모델로 처리
+            self._predictors[crop] = candidate
+        logger.info(f"{crop} 가격 예측 모델 교체: {previous_version} -> {result['version']}")
+        return {**result, 'reloaded': True, 'error': None}
+
+    def preload(self, crops):
+        for crop in crops:
+            if crop in self:
+                self[crop]
+            else:
+                logger.warning(f"미리 로드할 수 없는 작물입니다: {crop}")
+
+
+class PriceModelWatcher:
+    """
+    로드된 작물의 모델 파일 버전(크기, 수정 시각)을 주기적으로 확인해 바뀐 작물을 다시 로드합니다.
+    파일을 복사하는 도중에 로드하지 않도록 같은 새 버전이 두 번 연속 확인된 뒤에 교체하며,
+    검증에 실패한 버전은 파일이 다시 바뀔 때까지 재시도하지 않습니다.
+    """
+
+    def __init__(self, predictors, interval):
+        self.predictors = predictors
+        self.interval = interval
+        self._pending = {}  # 작물 -> 처음 발견한 새 버전
+        self._rejected = {}  # 작물 -> 검증에 실패한 버전
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="price-model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"가격 예측 모델 파일 확인 실패: {str(e)}")
+
+    def check(self):
+        for crop, version in self.predictors.versions().items():
+            try:
+                current = artifact_version(model_dir_for(crop))
+            except OSError:
+                continue  # 파일 교체 중
+            if current == version or current == self._rejected.get(crop):
+                self._pending.pop(crop, None)
+                continue
+            if self._pending.get(crop) != current:
+                self._pending[crop] = current
+                continue
+            del self._pending[crop]
+            result = reload_price_model(crop)
+            if not result['reloaded']:
+                self._rejected[crop] = current
+
+
+def reload_price_model(crop_name):
+    """crop_name 모델을 다시 로드하고 성공하면 해당 작물의 예측 결과 캐시를 비움"""
+    result = predict_prices_dict.reload(crop_name)
+    if result['reloaded'] and forecast_cache is not None:
+        forecast_cache.invalidate(crop_name)
+    return result
+
+
+# 각 작물별 예측 함수 (첫 요청 시 생성)
+predict_prices_dict = LazyPredictors(PRICE_CROPS, create_price_predictor)
+
+# 모델 파일 감시 스레드 (PRICE_MODEL_WATCH_INTERVAL > 0 일 때 start_model_watcher 로 시작)
+model_watcher = None
+
+
+def start_model_watcher():
+    """PRICE_MODEL_WATCH_INTERVAL 이 지정된 경우 모델 파일 감시를 시작 (이미 시작했으면 그대로)"""
+    global model_watcher
+    if PRICE_MODEL_WATCH_INTERVAL > 0 and model_watcher is None:
+        model_watcher = PriceModelWatcher(predict_prices_dict, PRICE_MODEL_WATCH_INTERVAL)
+        model_watcher.start()
+    return model_watcher
+
+
+def stop_model_watcher():
+    global model_watcher
+    if model_watcher is not None:
+        model_watcher.stop()
+        model_watcher = None
+
+def predict_prices(crop_name, weather_data=None, horizon_days=None, today=None):
     """
     작물 이름을 받아서 해당 작물의 가격을 예측하는 함수
+    horizon_days: 오늘을 포함한 예측 일수 (기본 DEFAULT_HORIZON_DAYS, 최대 MAX_HORIZON_DAYS)
+    today: 예측 시작 날짜 (기본 오늘). 자정을 넘겨 끝나는 요청도 한 날짜로 예측하고 캐시에 저장
     """
     if crop_name not in predict_prices_dict:
         return {"error": f"지원하지 않는 작물입니다: {crop_name}"}
+
+    horizon_days = DEFAULT_HORIZON_DAYS if horizon_days is None else horizon_days
+    if not MIN_HORIZON_DAYS <= horizon_days <= MAX_HORIZON_DAYS:
+        return {"error": f"예측 기간은 {MIN_HORIZON_DAYS}일에서 {MAX_HORIZON_DAYS}일 사이여야 합니다: {horizon_days}"}
     
     predictor = predict_prices_dict[crop_name]
     if predictor is None:
         return {"error": f"예측 모델을 생성할 수 없습니다: {crop_name}"}
-    
-    return predictor(weather_data)
+
+    today = today or date.today()
+    # 예측은 날씨와 무관하게 날짜와 최근 데이터로만 계산되므로 같은 날의 결과를 재사용
+    if forecast_cache is not None:
+        cached = forecast_cache.get(crop_name, predictor.version, horizon_days, today=today)
+        if cached is not None:
+            return cached
+
+    predictions = predictor(weather_data, horizon_days, start_date=today)
+    if forecast_cache is not None and 'error' not in predictions:
+        forecast_cache.put(crop_name, predictor.version, horizon_days, predictions, today=today)
+    return predictions
+
+
+def forecast_cache_stats():
+    """예측 결과 캐시 적중률과 작물별 항목 수"""
+    if forecast_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **forecast_cache.stats()}
 
 if __name__ == "__main__":
     # 각 작물에 대한 예측 테스트
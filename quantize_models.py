@@ -0,0 +1,223 @@
+"""
+분류 모델 INT8 양자화 스크립트
+
+FP32 ONNX 모델을 onnxruntime.quantization 으로 INT8 로 양자화하고, 평가 이미지에 대해
+FP32 모델과의 top-1 일치율과 지연 시간을 비교합니다. 일치율이 기준(--min-agreement)
+이상인 경우에만 모델 저장소에 model.int8.onnx 로 설치되며, 서빙에서는
+MODEL_VARIANT_<모델>=int8 (또는 MODEL_VARIANT=int8) 로 선택합니다.
+
+양자화 방식:
+    static  - 보정(calibration) 이미지로 활성값 범위를 구해 가중치와 활성값을 모두 INT8 로 (CNN 권장)
+    dynamic - 가중치만 미리 INT8 로, 활성값은 실행 시 양자화 (보정 이미지 불필요)
+
+사용 예:
+    python quantize_models.py --calibration samples/calib --eval samples/eval
+    python quantize_models.py kiwi tomato --mode static --calibration samples/calib
+    python quantize_models.py apple --mode dynamic --eval samples/eval --report int8_report.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+
+import model_registry
+import model_store
+from image_preprocessing import ImagePreprocessor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_AGREEMENT = 0.98
+DEFAULT_CALIBRATION_LIMIT = 200
+DEFAULT_LATENCY_RUNS = 50
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def list_images(image_dir, limit=None):
+    paths = [
+        os.path.join(image_dir, filename)
+        for filename in sorted(os.listdir(image_dir))
+        if filename.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    return paths[:limit] if limit else paths
+
+
+def load_inputs(name, image_dir, limit=None):
+    """서빙과 같은 전처리로 이미지 디렉토리를 (N, ...) 입력 배열로 변환"""
+    preprocessor = ImagePreprocessor(**model_registry.preprocess_config(name))
+    arrays = []
+    for path in list_images(image_dir, limit):
+        with open(path, "rb") as f:
+            arrays.append(preprocessor(f.read()))
+    if not arrays:
+        raise ValueError(f"이미지가 없습니다: {image_dir}")
+    return np.stack(arrays)
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """보정용 이미지를 한 장씩 모델에 공급"""
+
+    def __init__(self, input_name, inputs):
+        self._feeds = iter([{input_name: inputs[i:i + 1]} for i in range(len(inputs))])
+
+    def get_next(self):
+        return next(self._feeds, None)
+
+
+def _session(path):
+    return onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+
+def quantize(name, src_path, dst_path, mode, calibration_inputs=None):
+    if mode == "dynamic":
+        quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+        return
+    if calibration_inputs is None:
+        raise ValueError("static 양자화에는 --calibration 이미지가 필요합니다")
+    input_name = _session(src_path).get_inputs()[0].name
+    quantize_static(
+        src_path,
+        dst_path,
+        ImageCalibrationReader(input_name, calibration_inputs),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+
+def _run_each(session, inputs):
+    """한 장씩 실행 (배치 차원이 고정된 모델 포함 모든 모델에서 동작)"""
+    input_name = session.get_inputs()[0].name
+    return np.concatenate([session.run(None, {input_name: inputs[i:i + 1]})[0] for i in range(len(inputs))])
+
+
+def _top1(name, outputs):
+    if model_registry.is_binary(name):
+        return (outputs[:, 0] > 0.5).astype(int)
+    return outputs.argmax(axis=-1)
+
+
+def measure_latency(session, sample, runs=DEFAULT_LATENCY_RUNS):
+    """단일 이미지 지연 시간 (ms). 첫 실행은 워밍업으로 제외"""
+    input_name = session.get_inputs()[0].name
+    feed = {input_name: sample[None]}
+    session.run(None, feed)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        session.run(None, feed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "mean_ms": round(float(np.mean(timings)), 3),
+    }
+
+
+def compare(name, fp32_path, int8_path, eval_inputs, runs=DEFAULT_LATENCY_RUNS):
+    fp32_session, int8_session = _session(fp32_path), _session(int8_path)
+    fp32_top1 = _top1(name, _run_each(fp32_session, eval_inputs))
+    int8_top1 = _top1(name, _run_each(int8_session, eval_inputs))
+    fp32_latency = measure_latency(fp32_session, eval_inputs[0], runs)
+    int8_latency = measure_latency(int8_session, eval_inputs[0], runs)
+    return {
+        "eval_samples": int(len(eval_inputs)),
+        "top1_agreement": float(np.mean(fp32_top1 == int8_top1)),
+        "fp32_latency": fp32_latency,
+        "int8_latency": int8_latency,
+        "speedup_p50": round(fp32_latency["p50_ms"] / int8_latency["p50_ms"], 3) if int8_latency["p50_ms"] else None,
+        "fp32_size_bytes": os.path.getsize(fp32_path),
+        "int8_size_bytes": os.path.getsize(int8_path),
+    }
+
+
+def quantize_and_install(name, mode, calibration_dir=None, eval_dir=None,
+                         min_agreement=DEFAULT_MIN_AGREEMENT, calibration_limit=DEFAULT_CALIBRATION_LIMIT,
+                         runs=DEFAULT_LATENCY_RUNS):
+    fp32_path = model_store.onnx_path(name)
+    calibration_inputs = load_inputs(name, calibration_dir, calibration_limit) if calibration_dir else None
+    eval_dir = eval_dir or calibration_dir
+    if eval_dir is None:
+        raise ValueError("top-1 일치율을 계산할 --eval 또는 --calibration 이미지가 필요합니다")
+    eval_inputs = load_inputs(name, eval_dir)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        int8_path = os.path.join(tmp_dir, model_store.QUANTIZED_ONNX_FILENAME)
+        quantize(name, fp32_path, int8_path, mode, calibration_inputs)
+        report = compare(name, fp32_path, int8_path, eval_inputs, runs)
+        report.update({"name": name, "mode": mode, "min_agreement": min_agreement})
+        report["passed"] = report["top1_agreement"] >= min_agreement
+
+        if not report["passed"]:
+            logger.error(
+                f"{name}: top-1 일치율 {report['top1_agreement']:.4f} 가 기준 {min_agreement} 미만이라 설치하지 않습니다"
+            )
+            return report
+
+        model_store.install_derived(
+            name,
+            int8_path,
+            model_store.QUANTIZED_ONNX_FILENAME,
+            metadata={"quantization": {key: value for key, value in report.items() if key != "passed"}},
+        )
+    logger.info(
+        f"{name}: INT8 설치 완료 (일치율 {report['top1_agreement']:.4f}, "
+        f"p50 {report['fp32_latency']['p50_ms']}ms -> {report['int8_latency']['p50_ms']}ms)"
+    )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="분류 모델 INT8 양자화 및 정확도 회귀 검사")
+    parser.add_argument("names", nargs="*", help="모델 이름 (기본값: 전체)")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static", help="양자화 방식")
+    parser.add_argument("--calibration", help="보정 이미지 디렉토리 (static 필수)")
+    parser.add_argument("--calibration-limit", type=int, default=DEFAULT_CALIBRATION_LIMIT,
+                        help="보정에 사용할 최대 이미지 수")
+    parser.add_argument("--eval", help="FP32 대비 일치율을 잴 평가 이미지 디렉토리 (기본값: 보정 이미지)")
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="설치에 필요한 최소 top-1 일치율")
+    parser.add_argument("--runs", type=int, default=DEFAULT_LATENCY_RUNS, help="지연 시간 측정 반복 횟수")
+    parser.add_argument("--report", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    reports = {}
+    for name in args.names or model_store.MODEL_ARTIFACTS.keys():
+        try:
+            reports[name] = quantize_and_install(
+                name,
+                args.mode,
+                calibration_dir=args.calibration,
+                eval_dir=args.eval,
+                min_agreement=args.min_agreement,
+                calibration_limit=args.calibration_limit,
+                runs=args.runs,
+            )
+        except Exception as e:
+            logger.error(f"{name}: 양자화 실패: {str(e)}")
+            reports[name] = {"name": name, "passed": False, "error": str(e)}
+
+    output = json.dumps(reports, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+    return 0 if all(report["passed"] for report in reports.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+이미지 예측 요청의 단계별 시간 측정
+
+요청마다 측정기를 contextvar 에 두고, 업로드 읽기(read), 결과 캐시 조회(cache), 디코드(decode),
+리사이즈(resize), 정규화(normalize), 모델 실행(model), 응답 생성(response) 구간의 시간을
+기록합니다. 기록된 시간은 작물별/단계별 히스토그램에 누적되어 /metrics 로 노출되며,
+SERVER_TIMING_ENABLED=1 이면 응답의 Server-Timing 헤더에도 포함됩니다.
+
+추론 스레드 풀은 작업을 제출할 때 컨텍스트를 복사하므로 스레드에서 실행되는 디코드/전처리
+구간도 같은 요청에 기록됩니다. 요청 밖(벤치마크, 스크립트)에서는 아무것도 기록하지 않습니다.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+
+# 히스토그램 버킷 상한 (ms)
+STAGE_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+UNKNOWN_CROP = "unknown"
+
+_current = contextvars.ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """한 요청의 단계별 누적 시간 (ms)"""
+
+    def __init__(self):
+        self.crop = None
+        self.stages = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed_ms):
+        # 여러 장 업로드처럼 같은 단계가 여러 스레드에서 반복될 수 있어 누적
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._started) * 1000
+
+    def server_timing_header(self):
+        with self._lock:
+            items = list(self.stages.items())
+        entries = [f"{name};dur={elapsed_ms:.2f}" for name, elapsed_ms in items]
+        entries.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(entries)
+
+
+class StageHistograms:
+    """(작물, 단계) 별 지연 시간 히스토그램"""
+
+    def __init__(self, buckets_ms=STAGE_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._series = {}  # (작물, 단계) -> {"counts": [...], "sum": ms, "count": n, "max": ms}
+
+    def observe(self, crop, stage_name, elapsed_ms):
+        with self._lock:
+            series = self._series.get((crop, stage_name))
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets_ms) + 1), "sum": 0.0, "count": 0, "max": 0.0}
+                self._series[(crop, stage_name)] = series
+            index = next(
+                (i for i, bound in enumerate(self.buckets_ms) if elapsed_ms <= bound),
+                len(self.buckets_ms),
+            )
+            series["counts"][index] += 1
+            series["sum"] += elapsed_ms
+            series["count"] += 1
+            series["max"] = max(series["max"], elapsed_ms)
+
+    def _quantile(self, counts, total, q):
+        """버킷 상한으로 추정한 분위수 (ms). 마지막 버킷을 넘으면 None"""
+        target = q * total
+        cumulative = 0
+        for bound, count in zip(self.buckets_ms, counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            series = {key: {**value, "counts": list(value["counts"])} for key, value in self._series.items()}
+        result = {}
+        for (crop, stage_name), value in sorted(series.items()):
+            result.setdefault(crop, {})[stage_name] = {
+                "count": value["count"],
+                "avg_ms": round(value["sum"] / value["count"], 3),
+                "max_ms": round(value["max"], 3),
+                "p50_ms": self._quantile(value["counts"], value["count"], 0.5),
+                "p95_ms": self._quantile(value["counts"], value["count"], 0.95),
+                "p99_ms": self._quantile(value["counts"], value["count"], 0.99),
+            }
+        return result
+
+    def prometheus_text(self, metric="image_predict_stage_seconds"):
+        with self._lock:
+            series = {key: {**value, "counts": list(value["counts"])} for key, value in self._series.items()}
+        lines = [
+            f"# HELP {metric} 이미지 예측 요청의 단계별 처리 시간",
+            f"# TYPE {metric} histogram",
+        ]
+        for (crop, stage_name), value in sorted(series.items()):
+            labels = f'crop="{crop}",stage="{stage_name}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets_ms, value["counts"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound / 1000:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {value["count"]}')
+            lines.append(f"{metric}_sum{{{labels}}} {value['sum'] / 1000:.6f}")
+            lines.append(f"{metric}_count{{{labels}}} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+stage_histograms = StageHistograms()
+
+
+def begin():
+    """요청 시작. 현재 컨텍스트에 새 측정기를 설정하고 반환"""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def finish(timing):
+    """요청 종료. 작물이 지정된 요청(이미지 예측)만 전체 시간을 히스토그램에 기록"""
+    if timing.crop is not None:
+        stage_histograms.observe(timing.crop, "total", timing.elapsed_ms())
+
+
+def set_crop(crop):
+    timing = _current.get()
+    if timing is not None:
+        timing.crop = crop
+
+
+def merge(stages):
+    """다른 프로세스(원격 추론 서버)에서 측정한 단계별 시간을 현재 요청에 추가"""
+    timing = _current.get()
+    if timing is None:
+        return
+    for name, elapsed_ms in stages.items():
+        timing.add(name, elapsed_ms)
+        stage_histograms.observe(timing.crop or UNKNOWN_CROP, name, elapsed_ms)
+
+
+@contextmanager
+def stage(name):
+    """with 블록의 실행 시간을 현재 요청의 name 단계로 기록"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        timing.add(name, elapsed_ms)
+        stage_histograms.observe(timing.crop or UNKNOWN_CROP, name, elapsed_ms)
@@ -0,0 +1,187 @@
+"""
+이미지 분류 결과 캐시
+
+업로드 바이트의 sha256 과 모델 이름/버전을 키로 분류 결과를 보관합니다.
+타임아웃 후 같은 사진을 다시 올리는 경우 디코드와 추론 없이 저장된 결과를 돌려줍니다.
+메모리 LRU 가 기본이며, 경로를 지정하면 SQLite 파일에도 기록해 재시작 후에도 재사용합니다.
+SQLite 조회/저장은 전용 스레드 하나에서만 실행되므로 이벤트 루프는 메모리 LRU 만 다룹니다.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 영속 저장소 정리 주기 (저장 횟수 기준)
+PERSIST_TRIM_INTERVAL = 100
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, persist_path=None):
+        self.max_entries = max(1, int(max_entries))
+        self.persist_path = persist_path or None
+        self._entries = OrderedDict()  # 키 -> 결과 dict, 마지막 항목이 가장 최근 사용
+        self._lock = threading.Lock()
+        self._conn = None
+        self._io = None  # SQLite 전용 스레드 (영속 저장소를 쓸 때만)
+        self._puts_since_trim = 0
+        self._stats = {"hits": 0, "misses": 0, "persistent_hits": 0, "stores": 0, "evictions": 0}
+
+        if self.persist_path:
+            self._open_persistent()
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+            # SQLite 연결은 fork 한 프로세스끼리 공유할 수 없으므로 사전 fork 모드의 워커에서는 새로 연결
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=self._reopen_after_fork)
+
+    def _open_persistent(self):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.persist_path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"결과 캐시 파일을 열 수 없어 메모리 캐시만 사용합니다: {str(e)}")
+            self._conn = None
+
+    def _reopen_after_fork(self):
+        # 부모의 연결은 닫지 않고 버림 (닫으면 부모 쪽 SQLite 잠금 상태가 바뀔 수 있음)
+        self._lock = threading.Lock()
+        self._conn = None
+        # 부모의 스레드는 자식 프로세스로 이어지지 않으므로 전용 스레드도 새로 만듦
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+        self._open_persistent()
+
+    @staticmethod
+    def make_key(digest, model_name, model_version):
+        return f"{digest}:{model_name}:{model_version}"
+
+    def get(self, key):
+        """동기 조회. 메모리에 없으면 SQLite 조회가 끝날 때까지 기다리므로 이벤트 루프에서는 aget 사용"""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if self._conn is not None:
+            value = self._io.submit(self._load_persistent, key).result()
+        return self._finish_get(key, value)
+
+    async def aget(self, key):
+        """메모리 LRU 는 바로 확인하고, SQLite 조회는 전용 스레드에서 실행"""
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if self._conn is not None:
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(self._io, self._load_persistent, key)
+        return self._finish_get(key, value)
+
+    def put(self, key, value):
+        """메모리에 저장하고 SQLite 기록은 전용 스레드에 맡긴 뒤 바로 반환"""
+        with self._lock:
+            self._remember(key, value)
+            self._stats["stores"] += 1
+        if self._conn is not None:
+            self._io.submit(self._store_persistent, key, value)
+
+    def _get_memory(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return value
+            return None
+
+    def _finish_get(self, key, value):
+        """메모리에 없던 키의 조회 결과(SQLite 결과 또는 None)를 통계와 LRU 에 반영"""
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["persistent_hits"] += 1
+            self._remember(key, value)
+            return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._conn is not None,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+                **self._stats,
+            }
+
+    def _remember(self, key, value):
+        """호출 시 self._lock 을 잡고 있어야 함"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _load_persistent(self, key):
+        """전용 스레드에서만 호출"""
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"결과 캐시 조회 실패: {str(e)}")
+            return None
+
+    def _store_persistent(self, key, value):
+        """전용 스레드에서만 호출"""
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, accessed_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= PERSIST_TRIM_INTERVAL:
+                # 가장 오래 사용되지 않은 항목부터 max_entries 를 넘는 만큼 삭제
+                self._conn.execute(
+                    "DELETE FROM results WHERE key NOT IN ("
+                    " SELECT key FROM results ORDER BY accessed_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._puts_since_trim = 0
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"결과 캐시 저장 실패: {str(e)}")
+
+
+def default_result_cache():
+    if os.getenv("RESULT_CACHE_ENABLED", "1") != "1":
+        return None
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+        persist_path=os.getenv("RESULT_CACHE_PATH") or None,
+    )
@@ -0,0 +1,82 @@
+import importlib.util
+import os
+from datetime import date, timedelta
+
+import pytest
+
+# pricepython/__init__ 은 pandas 등을 import 하므로 캐시 모듈만 파일 경로로 로드
+_spec = importlib.util.spec_from_file_location(
+    "forecast_cache",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pricepython", "forecast_cache.py"),
+)
+forecast_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(forecast_cache)
+
+TODAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def cache():
+    return forecast_cache.ForecastCache(max_entries=8)
+
+
+def test_hit_on_same_day_and_version(cache):
+    cache.put("apple", "v1", 7, {"prices": [1, 2]}, today=TODAY)
+
+    assert cache.get("apple", "v1", 7, today=TODAY) == {"prices": [1, 2]}
+
+
+def test_new_model_version_misses(cache):
+    cache.put("apple", "v1", 7, {"prices": [1]}, today=TODAY)
+
+    assert cache.get("apple", "v2", 7, today=TODAY) is None
+
+
+def test_day_change_clears_previous_day(cache):
+    cache.put("apple", "v1", 7, {"prices": [1]}, today=TODAY)
+    cache.put("pear", "v1", 7, {"prices": [2]}, today=TODAY)
+
+    assert cache.get("apple", "v1", 7, today=TODAY + timedelta(days=1)) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_request_started_before_midnight_does_not_roll_back_or_store(cache):
+    tomorrow = TODAY + timedelta(days=1)
+    cache.put("apple", "v1", 7, {"prices": [1]}, today=tomorrow)
+
+    # 자정 전에 시작한 요청의 결과는 저장하지 않고 오늘 결과도 지우지 않음
+    cache.put("apple", "v1", 7, {"prices": [0]}, today=TODAY)
+
+    assert cache.get("apple", "v1", 7, today=TODAY) is None
+    assert cache.get("apple", "v1", 7, today=tomorrow) == {"prices": [1]}
+
+
+def test_invalidate_drops_only_that_crop(cache):
+    cache.put("apple", "v1", 7, {"prices": [1]}, today=TODAY)
+    cache.put("pear", "v1", 7, {"prices": [2]}, today=TODAY)
+
+    assert cache.invalidate("apple") == 1
+    assert cache.get("apple", "v1", 7, today=TODAY) is None
+    assert cache.get("pear", "v1", 7, today=TODAY) == {"prices": [2]}
+
+
+def test_caller_mutation_does_not_change_cached_result(cache):
+    value = {"prices": [1, 2]}
+    cache.put("apple", "v1", 7, value, today=TODAY)
+    value["prices"].append(3)
+    cache.get("apple", "v1", 7, today=TODAY)["prices"].append(4)
+
+    assert cache.get("apple", "v1", 7, today=TODAY) == {"prices": [1, 2]}
+
+
+def test_lru_eviction_over_max_entries():
+    cache = forecast_cache.ForecastCache(max_entries=2)
+    cache.put("apple", "v1", 7, {"prices": [1]}, today=TODAY)
+    cache.put("pear", "v1", 7, {"prices": [2]}, today=TODAY)
+    cache.get("apple", "v1", 7, today=TODAY)
+    cache.put("grape", "v1", 7, {"prices": [3]}, today=TODAY)
+
+    assert cache.get("pear", "v1", 7, today=TODAY) is None
+    assert cache.get("apple", "v1", 7, today=TODAY) == {"prices": [1]}
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from inference_batcher import MicroBatcher
+
+
+def _recording_runner():
+    batch_sizes = []
+
+    def run_batch(inputs):
+        batch_sizes.append(len(inputs))
+        return inputs * 2
+
+    return run_batch, batch_sizes
+
+
+def test_flushes_when_batch_is_full():
+    run_batch, batch_sizes = _recording_runner()
+
+    async def scenario():
+        # 대기 시간이 길어도 max_batch_size 개가 모이면 바로 실행
+        batcher = MicroBatcher("kiwi", run_batch, max_batch_size=4, max_wait_ms=10_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(np.array([i])) for i in range(4))), timeout=1
+        )
+
+    outputs = asyncio.run(scenario())
+
+    assert batch_sizes == [4]
+    assert [int(output[0]) for output in outputs] == [0, 2, 4, 6]
+
+
+def test_flushes_partial_batch_after_max_wait():
+    run_batch, batch_sizes = _recording_runner()
+
+    async def scenario():
+        batcher = MicroBatcher("kiwi", run_batch, max_batch_size=8, max_wait_ms=20)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        outputs = await asyncio.gather(*(batcher.submit(np.array([i])) for i in range(3)))
+        return outputs, loop.time() - started
+
+    outputs, elapsed = asyncio.run(scenario())
+
+    assert batch_sizes == [3]
+    assert elapsed >= 0.015
+    assert [int(output[0]) for output in outputs] == [0, 2, 4]
+
+
+def test_splits_burst_larger_than_max_batch_size():
+    run_batch, batch_sizes = _recording_runner()
+
+    async def scenario():
+        batcher = MicroBatcher("kiwi", run_batch, max_batch_size=2, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(np.array([i])) for i in range(5)))
+
+    outputs = asyncio.run(scenario())
+
+    assert sorted(batch_sizes) == [1, 2, 2]
+    assert [int(output[0]) for output in outputs] == [0, 2, 4, 6, 8]
+
+
+def test_batch_error_is_raised_to_every_request():
+    def run_batch(inputs):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        batcher = MicroBatcher("kiwi", run_batch, max_batch_size=2, max_wait_ms=10_000)
+        results = await asyncio.gather(
+            *(batcher.submit(np.array([i])) for i in range(2)), return_exceptions=True
+        )
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats["errors"] == 1
@@ -0,0 +1,74 @@
+import pytest
+
+import model_pool
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def _no_rss(monkeypatch):
+    # RSS 차이 대신 size_hint 를 모델 비용으로 쓰도록 고정
+    monkeypatch.setattr(model_pool, "current_rss_bytes", lambda: None)
+
+
+def _pool(budget_bytes, sizes, failing=()):
+    loads = []
+
+    def loader(name):
+        def load():
+            loads.append(name)
+            return None if name in failing else object()
+        return load
+
+    pool = model_pool.ModelPool(
+        {name: loader(name) for name in sizes},
+        budget_bytes=budget_bytes,
+        size_hint=sizes.__getitem__,
+    )
+    return pool, loads
+
+
+def test_evicts_least_recently_used_model_over_budget():
+    pool, _ = _pool(250 * MB, {"kiwi": 100 * MB, "chamoe": 100 * MB, "plum": 100 * MB})
+    pool.get("kiwi")
+    pool.get("chamoe")
+    pool.get("kiwi")  # chamoe 가 가장 오래 사용되지 않은 모델
+
+    pool.get("plum")
+
+    assert "chamoe" not in pool
+    assert "kiwi" in pool and "plum" in pool
+    assert pool.resident_bytes() == 200 * MB
+    assert pool.stats()["models"]["chamoe"]["evictions"] == 1
+
+
+def test_resident_model_is_not_reloaded():
+    pool, loads = _pool(None, {"kiwi": 100 * MB})
+
+    first = pool.get("kiwi")
+
+    assert pool.get("kiwi") is first
+    assert loads == ["kiwi"]
+    assert pool.stats()["models"]["kiwi"]["hits"] == 1
+
+
+def test_single_model_over_budget_stays_resident():
+    pool, _ = _pool(50 * MB, {"kiwi": 100 * MB})
+
+    assert pool.get("kiwi") is not None
+    assert "kiwi" in pool
+
+
+def test_failed_load_is_not_retried_immediately():
+    pool, loads = _pool(None, {"kiwi": 100 * MB}, failing={"kiwi"})
+
+    assert pool.get("kiwi") is None
+    assert pool.get("kiwi") is None
+    assert loads == ["kiwi"]
+
+
+def test_unknown_model_raises_key_error():
+    pool, _ = _pool(None, {"kiwi": 100 * MB})
+
+    with pytest.raises(KeyError):
+        pool.get("apple")
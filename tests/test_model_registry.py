@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import model_registry
+
+
+def _load_with_overrides(tmp_path, monkeypatch, overrides):
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps(overrides), encoding="utf-8")
+    monkeypatch.setenv("MODEL_REGISTRY_PATH", str(path))
+    return model_registry._load_registry()
+
+
+def test_partial_source_override_keeps_other_source_fields(tmp_path, monkeypatch):
+    registry = _load_with_overrides(tmp_path, monkeypatch, {"kiwi": {"source": {"revision": "abc123"}}})
+
+    source = registry["kiwi"]["source"]
+    assert source["revision"] == "abc123"
+    assert source["repo"] == model_registry.MODEL_REGISTRY["kiwi"]["source"]["repo"]
+    assert source["filename"] == model_registry.MODEL_REGISTRY["kiwi"]["source"]["filename"]
+
+
+def test_partial_input_override_keeps_layout_and_normalization(tmp_path, monkeypatch):
+    registry = _load_with_overrides(tmp_path, monkeypatch, {"kiwi": {"input": {"size": [256, 256]}}})
+
+    assert registry["kiwi"]["input"] == {"size": (256, 256), "layout": "NCHW", "normalization": "imagenet"}
+    # 지정하지 않은 필드와 다른 모델은 그대로
+    assert registry["kiwi"]["labels"] == model_registry.MODEL_REGISTRY["kiwi"]["labels"]
+    assert registry["chamoe"] == model_registry._normalize_entry("chamoe", model_registry.MODEL_REGISTRY["chamoe"])
+
+
+def test_partial_batch_override_merges_with_registry_batch(tmp_path, monkeypatch):
+    registry = _load_with_overrides(tmp_path, monkeypatch, {"kiwi": {"batch": {"max_wait_ms": 2}}})
+
+    assert registry["kiwi"]["batch"] == {"max_batch_size": 4, "max_wait_ms": 2}
+
+
+def test_new_model_requires_source_fields(tmp_path, monkeypatch):
+    with pytest.raises(model_registry.ModelRegistryError):
+        _load_with_overrides(tmp_path, monkeypatch, {"pear": {
+            "source": {"revision": "main"},
+            "labels": ["a", "b"],
+            "message": "done",
+        }})
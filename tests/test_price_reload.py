@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("joblib")
+
+from pricepython.price import LazyPredictors
+
+
+class _Predictor:
+    def __init__(self, version, healthy=True):
+        self.version = version
+        self.healthy = healthy
+
+    def __call__(self, *args, **kwargs):
+        return {"version": self.version}
+
+
+def _validate(predictor):
+    return None if predictor.healthy else "smoke 예측 실패"
+
+
+def _predictors(versions):
+    """factory 호출마다 versions 의 다음 (버전, 정상 여부) 로 예측 함수를 만듦"""
+    queue = list(versions)
+    return LazyPredictors(["apple"], lambda crop: _Predictor(*queue.pop(0)), validate=_validate)
+
+
+def test_reload_swaps_to_validated_model():
+    predictors = _predictors([("v1", True), ("v2", True)])
+    old = predictors["apple"]
+
+    result = predictors.reload("apple")
+
+    assert result["reloaded"] is True
+    assert (result["previous_version"], result["version"]) == ("v1", "v2")
+    assert predictors["apple"].version == "v2"
+    # 교체 전에 받은 예측 함수는 그대로 사용할 수 있음
+    assert old() == {"version": "v1"}
+
+
+def test_reload_keeps_previous_model_when_validation_fails():
+    predictors = _predictors([("v1", True), ("v2", False)])
+    previous = predictors["apple"]
+
+    result = predictors.reload("apple")
+
+    assert result["reloaded"] is False
+    assert result["error"] == "smoke 예측 실패"
+    assert predictors["apple"] is previous
+    assert predictors.versions() == {"apple": "v1"}
+
+
+def test_reload_unknown_crop_raises_key_error():
+    predictors = _predictors([])
+
+    with pytest.raises(KeyError):
+        predictors.reload("banana")
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import upload_guard
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+class _FakeUpload:
+    """UploadFile.read(size) 만 흉내 내는 업로드 파일"""
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+def _read(data, max_bytes):
+    upload = _FakeUpload(data)
+    return asyncio.run(upload_guard.read_image_upload(upload, max_bytes=max_bytes)), upload
+
+
+def test_accepts_image_within_limit():
+    data = PNG_HEADER + b"\x00" * 100
+
+    body, _ = _read(data, max_bytes=1024)
+
+    assert body == data
+
+
+def test_oversized_upload_is_rejected_with_413_without_reading_rest():
+    data = PNG_HEADER + b"\x00" * (upload_guard.UPLOAD_CHUNK_SIZE * 4)
+    upload = _FakeUpload(data)
+
+    with pytest.raises(upload_guard.UploadRejected) as excinfo:
+        asyncio.run(upload_guard.read_image_upload(upload, max_bytes=upload_guard.UPLOAD_CHUNK_SIZE))
+
+    assert excinfo.value.status_code == 413
+    # 한도를 넘은 두 번째 청크에서 멈춤
+    assert upload.reads == 2
+
+
+def test_heic_upload_is_rejected_with_415():
+    heic = b"\x00\x00\x00\x18ftypheic" + b"\x00" * 32
+
+    with pytest.raises(upload_guard.UploadRejected) as excinfo:
+        _read(heic, max_bytes=1024)
+
+    assert excinfo.value.status_code == 415
+
+
+def test_unknown_format_is_rejected_with_415():
+    with pytest.raises(upload_guard.UploadRejected) as excinfo:
+        _read(b"%PDF-1.7\n" + b"\x00" * 32, max_bytes=1024)
+
+    assert excinfo.value.status_code == 415
+
+
+def test_empty_upload_is_rejected_with_400():
+    with pytest.raises(upload_guard.UploadRejected) as excinfo:
+        _read(b"", max_bytes=1024)
+
+    assert excinfo.value.status_code == 400
+
+
+def _call_middleware(limit, body_chunks, content_length=None):
+    """UploadLimitMiddleware 를 거쳐 본문을 끝까지 읽는 앱을 호출하고 보낸 응답 메시지를 반환"""
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+        for i, chunk in enumerate(body_chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    scope = {"type": "http", "method": "POST", "path": "/predict", "headers": headers}
+    middleware = upload_guard.UploadLimitMiddleware(app, lambda path: limit)
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def test_middleware_rejects_declared_content_length_over_limit():
+    sent = _call_middleware(limit=10, body_chunks=[b"x" * 20], content_length=20)
+
+    assert sent[0]["status"] == 413
+
+
+def test_middleware_rejects_chunked_body_once_limit_is_exceeded():
+    sent = _call_middleware(limit=10, body_chunks=[b"x" * 6, b"x" * 6])
+
+    assert sent[0]["status"] == 413
+
+
+def test_middleware_passes_body_within_limit():
+    sent = _call_middleware(limit=10, body_chunks=[b"x" * 4, b"x" * 4], content_length=8)
+
+    assert sent[0]["status"] == 200
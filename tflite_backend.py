@@ -0,0 +1,61 @@
+"""
+TFLite 추론 백엔드
+
+convert_models.py --backend tflite 로 변환한 Keras 질병 분류 모델을 TFLite 인터프리터로 실행합니다.
+부동소수점 모델은 인터프리터의 기본 delegate 인 XNNPACK 으로 실행되며, Keras predict 처럼
+호출마다 입력 파이프라인을 만들지 않아 한 장짜리 추론의 고정 비용이 작습니다.
+
+tflite-runtime 패키지가 있으면 사용하고, 없으면 tensorflow.lite 를 사용합니다.
+"""
+import threading
+
+import numpy as np
+
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tensorflow.lite import Interpreter
+        except ImportError:
+            raise ImportError("TFLite 백엔드에는 tflite-runtime 또는 tensorflow 패키지가 필요합니다")
+    return Interpreter
+
+
+def is_available():
+    try:
+        _interpreter_class()
+        return True
+    except ImportError:
+        return False
+
+
+class TFLiteModel:
+    """
+    onnxruntime 세션과 같은 자리에서 쓰도록 (N, ...) 배치를 받아 (N, 클래스 수) 출력을 반환하는 래퍼.
+    인터프리터는 스레드에 안전하지 않으므로 한 번에 하나의 배치만 실행합니다.
+    배치 크기가 바뀔 때마다 텐서를 다시 할당하는 비용을 피하기 위해 입력 크기를 1 로 고정하고 한 장씩 실행합니다.
+    """
+
+    def __init__(self, path, num_threads=1):
+        self.path = path
+        self.num_threads = num_threads
+        self._interpreter = _interpreter_class()(model_path=path, num_threads=num_threads)
+        input_detail = self._interpreter.get_input_details()[0]
+        if int(input_detail["shape"][0]) != 1:
+            self._interpreter.resize_tensor_input(input_detail["index"], [1, *input_detail["shape"][1:]])
+        self._interpreter.allocate_tensors()
+        self._input_index = input_detail["index"]
+        self._output_index = self._interpreter.get_output_details()[0]["index"]
+        self._lock = threading.Lock()
+
+    def run(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        outputs = []
+        with self._lock:
+            for i in range(len(batch)):
+                self._interpreter.set_tensor(self._input_index, batch[i:i + 1])
+                self._interpreter.invoke()
+                outputs.append(self._interpreter.get_tensor(self._output_index).copy())
+        return np.concatenate(outputs)
@@ -0,0 +1,157 @@
+"""
+이미지 업로드 수신 제한
+
+예측 엔드포인트의 업로드를 디코드 전에 검사해 빠르게 거절합니다.
+    - 요청 본문 크기: Content-Length 가 한도를 넘으면 본문을 읽기 전에 413,
+      Content-Length 가 없는 (chunked) 요청은 받은 바이트 수를 세다가 한도를 넘는 순간 413
+    - 파일 크기: 업로드 파일을 청크 단위로 읽으며 UPLOAD_MAX_BYTES 를 넘으면 413
+    - 형식: 첫 청크의 매직 바이트로 JPEG/PNG/WEBP/BMP/GIF 만 허용하고 HEIC 등은 415
+
+multipart 본문의 파일 부분은 Starlette 가 1MB 를 넘으면 임시 파일로 내려 두므로(SpooledTemporaryFile)
+큰 업로드도 메모리에는 한도 이하의 이미지 바이트만 올라옵니다.
+"""
+import json
+import os
+
+from fastapi import HTTPException
+
+# 업로드 이미지 한 장의 최대 크기 (bytes)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# multipart 경계, 헤더 등 파일 외 본문 여유분
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+BODY_TOO_LARGE_MESSAGE = "업로드 크기가 허용 한도를 넘었습니다"
+
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1", b"avif", b"avis"}
+
+
+class UploadRejected(Exception):
+    """디코드 전에 거절한 업로드. status_code 는 응답 상태 코드"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_format(head: bytes):
+    """파일 앞부분의 매직 바이트로 이미지 형식 판별 (지원하지 않는 형식이면 None)"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def check_image_header(head: bytes):
+    if not head:
+        raise UploadRejected("빈 파일입니다", status_code=400)
+    if sniff_image_format(head) is not None:
+        return
+    if head[4:8] == b"ftyp" and head[8:12] in HEIF_BRANDS:
+        raise UploadRejected(
+            "HEIC/HEIF 형식은 지원하지 않습니다. JPEG 또는 PNG 로 변환해 올려주세요",
+            status_code=415,
+        )
+    raise UploadRejected(
+        "지원하지 않는 파일 형식입니다. JPEG, PNG, WEBP, BMP, GIF 이미지만 올릴 수 있습니다",
+        status_code=415,
+    )
+
+
+async def read_image_upload(file, max_bytes=UPLOAD_MAX_BYTES) -> bytes:
+    """
+    업로드 파일을 청크 단위로 읽어 바이트로 반환합니다.
+    첫 청크에서 형식을 확인하고, 읽는 도중 max_bytes 를 넘으면 나머지를 읽지 않고 거절합니다.
+    """
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if not chunks:
+            check_image_header(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadRejected(
+                f"이미지 크기는 최대 {max_bytes // (1024 * 1024)}MB 까지 올릴 수 있습니다",
+                status_code=413,
+            )
+        chunks.append(chunk)
+    if not chunks:
+        check_image_header(b"")
+    return b"".join(chunks)
+
+
+class _BodyTooLarge(HTTPException):
+    """본문을 읽는 도중 한도를 넘은 경우. 본문 파싱 중에 발생하면 FastAPI 가 그대로 413 응답으로 변환"""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=BODY_TOO_LARGE_MESSAGE)
+
+
+class UploadLimitMiddleware:
+    """
+    경로별 요청 본문 크기 제한 (ASGI 미들웨어)
+    limit_for_path: 경로를 받아 최대 본문 크기(bytes)를 반환, 제한하지 않을 경로는 None
+    """
+
+    def __init__(self, app, limit_for_path):
+        self.app = app
+        self.limit_for_path = limit_for_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            return await self.app(scope, receive, send)
+        limit = self.limit_for_path(scope["path"])
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            return await self._reject(send)
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await self._reject(send)
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": BODY_TOO_LARGE_MESSAGE}, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})